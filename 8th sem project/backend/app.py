@@ -418,7 +418,7 @@ async def get_stats(db: Session = Depends(get_db)):
         error_rate = 0
     
     # Calculate real-time metrics from middleware
-    live_avg_response = sum(current_live_stats['response_times']) / len(current_live_stats['response_times']) if current_live_stats['response_times'] else avg_response
+    live_avg_response = current_live_stats['recent_response_time_total'] / len(current_live_stats['response_times']) if current_live_stats['response_times'] else avg_response
     live_error_rate = current_live_stats['error_count'] / current_live_stats['total_requests'] if current_live_stats['total_requests'] > 0 else error_rate
     
     print(f"[STATS] Live mode counter: {current_live_stats['total_requests']}, DB logs: {total_logs}, Anomalies: {current_live_stats['anomalies_detected']}")
@@ -15,10 +15,11 @@ from typing import Optional, List, Dict
 from database import init_db, get_db, APILog, AnomalyLog
 from models import (
     LoginRequest, PaymentRequest, SearchQuery, 
-    APILogResponse, AnomalyResponse, AdminQueryRequest, AdminQueryResponse
+    APILogResponse, APILogSummary, AnomalyResponse, AnomalySummary,
+    AdminQueryRequest, AdminQueryResponse
 )
-from live_middleware import EnhancedLoggingMiddleware, get_live_stats
-from inference_enhanced import HybridDetectionEngine
+from live_middleware import EnhancedLoggingMiddleware, close_live_middlewares, get_live_stats
+from inference_enhanced import get_engine
 from window_manager import live_window_manager, simulation_window_manager
 from traffic_simulator import traffic_simulator
 from simulation_manager_v2 import endpoint_history, endpoint_generator
@@ -43,7 +44,7 @@ app.add_middleware(
 )
 
 # Initialize detection engine
-detection_engine = HybridDetectionEngine()
+detection_engine = get_engine()
 
 # Add enhanced logging middleware for LIVE MODE
 app.add_middleware(EnhancedLoggingMiddleware, detection_engine=detection_engine)
@@ -84,6 +85,12 @@ async def startup_event():
     print()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write any live request logs still queued for the batch writer"""
+    await close_live_middlewares()
+
+
 # ============================================================================
 # LIVE MODE ENDPOINTS
 # ============================================================================
@@ -531,13 +538,13 @@ async def run_auto_detection_simulation(
                 simulation_stats['total_requests'] += 1
                 
                 features = simulation_window_manager.add_request(
-                    method=req['method'],
-                    path=req['path'],
-                    status=req['status'],
-                    latency=req['latency'],
-                    payload_size=req['payload_size'],
-                    user_agent=req['user_agent'],
-                    parameters=req.get('parameters', {})
+                    method=req.method,
+                    path=req.path,
+                    status=req.status,
+                    latency=req.latency,
+                    payload_size=req.payload_size,
+                    user_agent=req.user_agent,
+                    parameters=req.parameters
                 )
                 
                 # Run ML inference ONCE per window (when window is full)
@@ -567,7 +574,7 @@ async def run_auto_detection_simulation(
                             simulated_endpoint=simulated_endpoint,
                             anomaly_type=prediction.get('detection_method', 'AUTO_DETECTED'),
                             detection_result=prediction,
-                            method=req['method'],
+                            method=req.method,
                             window_id=features['window_id']
                         )
                         
@@ -624,44 +631,17 @@ async def run_auto_detection_simulation(
 # ANALYTICS & MONITORING ENDPOINTS
 # ============================================================================
 
-@app.get("/api/logs")
+@app.get("/api/logs", response_model=list[APILogSummary])
 async def get_api_logs(limit: int = 100, db: Session = Depends(get_db)):
     """Get recent API request logs"""
-    logs = db.query(APILog).order_by(APILog.timestamp.desc()).limit(limit).all()
-    
-    return [
-        {
-            "id": log.id,
-            "timestamp": log.timestamp.isoformat(),
-            "endpoint": log.endpoint,
-            "method": log.method,
-            "status_code": log.status_code,
-            "response_time_ms": log.response_time_ms,
-            "payload_size": log.payload_size,
-            "ip_address": log.ip_address
-        }
-        for log in logs
-    ]
+    # Rows are serialized straight from the ORM objects by the response model
+    return db.query(APILog).order_by(APILog.timestamp.desc()).limit(limit).all()
 
 
-@app.get("/api/anomalies")
+@app.get("/api/anomalies", response_model=list[AnomalySummary])
 async def get_anomalies(limit: int = 50, db: Session = Depends(get_db)):
     """Get detected anomalies"""
-    anomalies = db.query(AnomalyLog).order_by(AnomalyLog.timestamp.desc()).limit(limit).all()
-    
-    return [
-        {
-            "id": anomaly.id,
-            "timestamp": anomaly.timestamp.isoformat(),
-            "endpoint": anomaly.endpoint,
-            "method": anomaly.method,
-            "risk_score": anomaly.risk_score,
-            "priority": anomaly.priority,
-            "is_anomaly": anomaly.is_anomaly,
-            "failure_probability": anomaly.failure_probability
-        }
-        for anomaly in anomalies
-    ]
+    return db.query(AnomalyLog).order_by(AnomalyLog.timestamp.desc()).limit(limit).all()
 
 
 @app.get("/api/dashboard")
@@ -3,12 +3,22 @@ Async Simulation Engine for High-Speed Traffic Generation (>150 req/sec)
 Generates continuous traffic to all endpoints with various anomaly types
 """
 import asyncio
+import queue
 import random
+import threading
 import time
-from datetime import datetime
-from typing import List, Dict, Tuple
+from dataclasses import asdict, dataclass
+from typing import List, Dict, Optional, Tuple
 from enum import Enum
 
+# Status-code distributions as (values, cumulative weights) for random.choices
+_NORMAL_STATUS_VALS, _NORMAL_STATUS_CW = (200, 400, 401, 404), (95, 100, 105, 110)
+_LATENCY_STATUS_VALS, _LATENCY_STATUS_CW = (200, 500, 503, 504), (70, 100, 130, 160)
+_ERROR_STATUS_VALS, _ERROR_STATUS_CW = (500, 503, 502, 504, 200), (70, 140, 210, 280, 310)
+_BURST_STATUS_VALS, _BURST_STATUS_CW = (200, 429, 503), (60, 100, 140)  # Rate limiting
+_TIMEOUT_STATUS_VALS, _TIMEOUT_STATUS_CW = (504, 408, 200), (80, 160, 180)
+_EXHAUSTION_STATUS_VALS, _EXHAUSTION_STATUS_CW = (503, 507, 500, 200), (70, 140, 210, 240)
+
 class AnomalyType(Enum):
     LATENCY_SPIKE = "latency_spike"
     ERROR_SPIKE = "error_spike"
@@ -17,11 +27,31 @@ class AnomalyType(Enum):
     RESOURCE_EXHAUSTION = "resource_exhaustion"
     NORMAL = "normal"
 
-class Severity(Enum):
-    CRITICAL = "CRITICAL"
-    HIGH = "HIGH"
-    MEDIUM = "MEDIUM"
-    LOW = "LOW"
+# Severity ordinals index the per-severity lookup tables below
+SEV_CRITICAL, SEV_HIGH, SEV_MEDIUM, SEV_LOW = range(4)
+_SEV_NAMES = ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW')
+_BASE_LATENCY = (5000, 3000, 1500, 800)
+_BASE_ERROR_RATE = (0.8, 0.6, 0.4, 0.2)
+_SEV_WEIGHT = (1.0, 0.75, 0.5, 0.25)
+
+@dataclass(slots=True)
+class SimRequest:
+    """A single simulated request (slotted: smaller and faster than a dict)"""
+    timestamp: int  # Unix epoch ms
+    endpoint: str
+    method: str
+    response_time_ms: int
+    status_code: int
+    payload_size: int
+    ip_address: str
+    user_id: str
+    anomaly_type: str
+    severity: str
+    duration_seconds: float
+    impact_score: float
+    
+    def to_dict(self):
+        return asdict(self)
 
 class AsyncSimulationEngine:
     """Generates high-speed async traffic with anomaly injection"""
@@ -37,6 +67,9 @@ class AsyncSimulationEngine:
     
     METHODS = ['GET', 'POST', 'PUT', 'DELETE']
     
+    # Continuous simulations emit small sub-batches on a fixed tick instead of one burst per second
+    TICK_INTERVAL = 0.1
+    
     # Anomaly injection probabilities (per endpoint)
     ANOMALY_PROBABILITIES = {
         '/sim/login': 0.15,
@@ -59,38 +92,38 @@ class AsyncSimulationEngine:
             '/sim/payment': {
                 'types': [AnomalyType.TIMEOUT, AnomalyType.ERROR_SPIKE, AnomalyType.RESOURCE_EXHAUSTION],
                 'weights': [0.4, 0.4, 0.2],
-                'severity_dist': {Severity.CRITICAL: 0.6, Severity.HIGH: 0.3, Severity.MEDIUM: 0.1}
+                'severity_dist': {SEV_CRITICAL: 0.6, SEV_HIGH: 0.3, SEV_MEDIUM: 0.1}
             },
             '/sim/search': {
                 'types': [AnomalyType.LATENCY_SPIKE, AnomalyType.RESOURCE_EXHAUSTION, AnomalyType.TRAFFIC_BURST],
                 'weights': [0.5, 0.3, 0.2],
-                'severity_dist': {Severity.HIGH: 0.5, Severity.MEDIUM: 0.4, Severity.LOW: 0.1}
+                'severity_dist': {SEV_HIGH: 0.5, SEV_MEDIUM: 0.4, SEV_LOW: 0.1}
             },
             '/sim/login': {
                 'types': [AnomalyType.ERROR_SPIKE, AnomalyType.LATENCY_SPIKE, AnomalyType.TRAFFIC_BURST],
                 'weights': [0.5, 0.3, 0.2],
-                'severity_dist': {Severity.HIGH: 0.6, Severity.MEDIUM: 0.3, Severity.LOW: 0.1}
+                'severity_dist': {SEV_HIGH: 0.6, SEV_MEDIUM: 0.3, SEV_LOW: 0.1}
             },
             '/sim/profile': {
                 'types': [AnomalyType.LATENCY_SPIKE, AnomalyType.TRAFFIC_BURST],
                 'weights': [0.6, 0.4],
-                'severity_dist': {Severity.MEDIUM: 0.6, Severity.LOW: 0.4}
+                'severity_dist': {SEV_MEDIUM: 0.6, SEV_LOW: 0.4}
             },
             '/sim/signup': {
                 'types': [AnomalyType.ERROR_SPIKE, AnomalyType.RESOURCE_EXHAUSTION],
                 'weights': [0.6, 0.4],
-                'severity_dist': {Severity.HIGH: 0.5, Severity.MEDIUM: 0.3, Severity.LOW: 0.2}
+                'severity_dist': {SEV_HIGH: 0.5, SEV_MEDIUM: 0.3, SEV_LOW: 0.2}
             },
             '/sim/logout': {
                 'types': [AnomalyType.LATENCY_SPIKE, AnomalyType.ERROR_SPIKE],
                 'weights': [0.5, 0.5],
-                'severity_dist': {Severity.MEDIUM: 0.5, Severity.LOW: 0.5}
+                'severity_dist': {SEV_MEDIUM: 0.5, SEV_LOW: 0.5}
             }
         }
         return configs.get(endpoint, {
             'types': [AnomalyType.LATENCY_SPIKE],
             'weights': [1.0],
-            'severity_dist': {Severity.MEDIUM: 1.0}
+            'severity_dist': {SEV_MEDIUM: 1.0}
         })
     
     def should_inject_anomaly(self, endpoint: str) -> bool:
@@ -110,49 +143,46 @@ class AsyncSimulationEngine:
         
         # Generate anomaly metrics based on type and severity
         if anomaly_type == AnomalyType.LATENCY_SPIKE:
-            base_latency = {'CRITICAL': 5000, 'HIGH': 3000, 'MEDIUM': 1500, 'LOW': 800}
-            response_time = base_latency[severity.value] + random.randint(-500, 1000)
+            response_time = _BASE_LATENCY[severity] + random.randint(-500, 1000)
             error_rate = random.uniform(0.05, 0.15)
-            status_codes = [200] * 70 + [500, 503, 504] * 30
+            status_code = random.choices(_LATENCY_STATUS_VALS, cum_weights=_LATENCY_STATUS_CW)[0]
             
         elif anomaly_type == AnomalyType.ERROR_SPIKE:
-            base_error_rate = {'CRITICAL': 0.8, 'HIGH': 0.6, 'MEDIUM': 0.4, 'LOW': 0.2}
-            error_rate = base_error_rate[severity.value] + random.uniform(-0.1, 0.1)
+            error_rate = _BASE_ERROR_RATE[severity] + random.uniform(-0.1, 0.1)
             response_time = random.randint(200, 800)
-            status_codes = [500, 503, 502, 504] * 70 + [200] * 30
+            status_code = random.choices(_ERROR_STATUS_VALS, cum_weights=_ERROR_STATUS_CW)[0]
             
         elif anomaly_type == AnomalyType.TRAFFIC_BURST:
             response_time = random.randint(500, 1200)
             error_rate = random.uniform(0.1, 0.3)
-            status_codes = [200] * 60 + [429, 503] * 40  # Rate limiting
+            status_code = random.choices(_BURST_STATUS_VALS, cum_weights=_BURST_STATUS_CW)[0]
             
         elif anomaly_type == AnomalyType.TIMEOUT:
             response_time = random.randint(8000, 15000)
             error_rate = random.uniform(0.7, 0.95)
-            status_codes = [504, 408] * 80 + [200] * 20
+            status_code = random.choices(_TIMEOUT_STATUS_VALS, cum_weights=_TIMEOUT_STATUS_CW)[0]
             
         elif anomaly_type == AnomalyType.RESOURCE_EXHAUSTION:
             response_time = random.randint(3000, 7000)
             error_rate = random.uniform(0.5, 0.8)
-            status_codes = [503, 507, 500] * 70 + [200] * 30
+            status_code = random.choices(_EXHAUSTION_STATUS_VALS, cum_weights=_EXHAUSTION_STATUS_CW)[0]
             
         else:  # NORMAL
             response_time = random.randint(50, 300)
             error_rate = random.uniform(0.0, 0.05)
-            status_codes = [200] * 95 + [400, 401, 404] * 5
+            status_code = random.choices(_NORMAL_STATUS_VALS, cum_weights=_NORMAL_STATUS_CW)[0]
         
-        duration = random.uniform(10, 60) if severity in [Severity.CRITICAL, Severity.HIGH] else random.uniform(5, 30)
+        duration = random.uniform(10, 60) if severity <= SEV_HIGH else random.uniform(5, 30)
         
         # Calculate impact score (0-1 scale)
-        severity_weights = {Severity.CRITICAL: 1.0, Severity.HIGH: 0.75, Severity.MEDIUM: 0.5, Severity.LOW: 0.25}
-        impact_score = severity_weights[severity] * (0.4 * error_rate + 0.3 * min(response_time / 10000, 1.0) + 0.3)
+        impact_score = _SEV_WEIGHT[severity] * (0.4 * error_rate + 0.3 * min(response_time / 10000, 1.0) + 0.3)
         
         return {
             'type': anomaly_type,
-            'severity': severity.value,
+            'severity': _SEV_NAMES[severity],
             'response_time': response_time,
             'error_rate': error_rate,
-            'status_codes': status_codes,
+            'status_code': status_code,
             'duration_seconds': duration,
             'impact_score': min(impact_score, 1.0)
         }
@@ -164,13 +194,17 @@ class AsyncSimulationEngine:
             'severity': 'NORMAL',
             'response_time': random.randint(50, 250),
             'error_rate': random.uniform(0.0, 0.03),
-            'status_codes': [200] * 95 + [400, 401, 404] * 5,
+            'status_code': random.choices(_NORMAL_STATUS_VALS, cum_weights=_NORMAL_STATUS_CW)[0],
             'duration_seconds': 0,
             'impact_score': 0.0
         }
     
-    async def generate_request(self, endpoint: str) -> Dict:
+    async def generate_request(self, endpoint: str, timestamp_ms: Optional[int] = None) -> SimRequest:
         """Generate a single request asynchronously"""
+        return self._build_request(endpoint, timestamp_ms)
+    
+    def _build_request(self, endpoint: str, timestamp_ms: Optional[int] = None) -> SimRequest:
+        """Generate a single request (shared by the async and sync paths)"""
         # Choose HTTP method based on endpoint
         if endpoint in ['/sim/login', '/sim/payment', '/sim/signup']:
             method = 'POST'
@@ -185,39 +219,61 @@ class AsyncSimulationEngine:
             params = self.generate_normal_request(endpoint)
             anomaly_type = 'normal'
         
-        status_code = random.choice(params['status_codes'])
-        
-        request = {
-            'timestamp': datetime.utcnow(),
-            'endpoint': endpoint,
-            'method': method,
-            'response_time_ms': params['response_time'],
-            'status_code': status_code,
-            'payload_size': random.randint(100, 5000),
-            'ip_address': f"192.168.{random.randint(1, 255)}.{random.randint(1, 255)}",
-            'user_id': f"user_{random.randint(1000, 9999)}",
-            'anomaly_type': anomaly_type,
-            'severity': params['severity'],
-            'duration_seconds': params['duration_seconds'],
-            'impact_score': params['impact_score']
-        }
+        request = SimRequest(
+            timestamp=timestamp_ms if timestamp_ms is not None else int(time.time() * 1000),
+            endpoint=endpoint,
+            method=method,
+            response_time_ms=params['response_time'],
+            status_code=params['status_code'],
+            payload_size=random.randint(100, 5000),
+            ip_address=f"192.168.{random.randint(1, 255)}.{random.randint(1, 255)}",
+            user_id=f"user_{random.randint(1000, 9999)}",
+            anomaly_type=anomaly_type,
+            severity=params['severity'],
+            duration_seconds=params['duration_seconds'],
+            impact_score=params['impact_score']
+        )
         
         self.total_requests += 1
         return request
     
-    async def generate_batch(self, batch_size: int = 200) -> List[Dict]:
-        """Generate a batch of requests concurrently"""
-        # Distribute requests across all endpoints
+    def _endpoint_counts(self, batch_size: int) -> Dict[str, int]:
+        """Distribute batch_size requests across all endpoints"""
         endpoint_counts = {ep: batch_size // len(self.ENDPOINTS) for ep in self.ENDPOINTS}
         # Add remainder to random endpoints
         remainder = batch_size % len(self.ENDPOINTS)
         for i in range(remainder):
             endpoint_counts[self.ENDPOINTS[i]] += 1
+        return endpoint_counts
+    
+    def _tick_sub_batches(self, target_rps: int) -> List[int]:
+        """
+        Sub-batch size for each tick of one second: target_rps spread over the
+        ticks Bresenham-style, so every second emits exactly target_rps requests
+        (some ticks may be empty at low rates)
+        """
+        ticks_per_second = int(round(1.0 / self.TICK_INTERVAL))
+        return [(tick + 1) * target_rps // ticks_per_second - tick * target_rps // ticks_per_second
+                for tick in range(ticks_per_second)]
+    
+    def generate_batch_sync(self, batch_size: int = 200) -> List[SimRequest]:
+        """Generate a batch of requests without going through the event loop"""
+        timestamp_ms = int(time.time() * 1000)  # One clock read per batch
+        return [
+            self._build_request(endpoint, timestamp_ms)
+            for endpoint, count in self._endpoint_counts(batch_size).items()
+            for _ in range(count)
+        ]
+    
+    async def generate_batch(self, batch_size: int = 200) -> List[SimRequest]:
+        """Generate a batch of requests concurrently"""
+        endpoint_counts = self._endpoint_counts(batch_size)
         
+        timestamp_ms = int(time.time() * 1000)  # One clock read per batch
         tasks = []
         for endpoint, count in endpoint_counts.items():
             for _ in range(count):
-                tasks.append(self.generate_request(endpoint))
+                tasks.append(self.generate_request(endpoint, timestamp_ms))
         
         requests = await asyncio.gather(*tasks)
         return requests
@@ -228,39 +284,104 @@ class AsyncSimulationEngine:
         self.start_time = time.time()
         self.total_requests = 0
         
-        batch_size = target_rps  # Generate target_rps requests per second
-        interval = 1.0  # 1 second interval
+        interval = self.TICK_INTERVAL
+        sub_batches = self._tick_sub_batches(target_rps)
+        ticks_per_second = len(sub_batches)
         
         print(f"🚀 Starting async simulation: {target_rps} req/sec target for {duration_seconds}s")
         
+        loop = asyncio.get_running_loop()
         end_time = time.time() + duration_seconds
+        next_tick = loop.time()
+        tick = 0
+        generated_since_report = 0
         
         while self.active and time.time() < end_time:
-            batch_start = time.time()
+            sub_batch = sub_batches[tick % ticks_per_second]
+            if sub_batch:
+                # Generate sub-batch asynchronously
+                requests = await self.generate_batch(sub_batch)
+                
+                # Yield requests for processing
+                yield requests
+                generated_since_report += len(requests)
             
-            # Generate batch asynchronously
-            requests = await self.generate_batch(batch_size)
+            tick += 1
+            if tick % ticks_per_second == 0:
+                # Calculate actual speed (reported once per second)
+                elapsed = time.time() - self.start_time
+                current_rps = self.total_requests / elapsed if elapsed > 0 else 0
+                print(f"⚡ Generated {generated_since_report} requests | Total: {self.total_requests} | Speed: {current_rps:.1f} req/s")
+                generated_since_report = 0
             
-            # Yield requests for processing
-            yield requests
-            
-            # Calculate actual speed
-            elapsed = time.time() - self.start_time
-            current_rps = self.total_requests / elapsed if elapsed > 0 else 0
-            
-            print(f"⚡ Generated {len(requests)} requests | Total: {self.total_requests} | Speed: {current_rps:.1f} req/s")
-            
-            # Sleep to maintain target rate
-            batch_time = time.time() - batch_start
-            sleep_time = max(0, interval - batch_time)
-            if sleep_time > 0:
-                await asyncio.sleep(sleep_time)
+            # Drift-corrected sleep to the next tick
+            next_tick += interval
+            await asyncio.sleep(max(0, next_tick - loop.time()))
         
         elapsed_total = time.time() - self.start_time
         final_rps = self.total_requests / elapsed_total if elapsed_total > 0 else 0
         print(f"✅ Simulation complete: {self.total_requests} requests in {elapsed_total:.1f}s ({final_rps:.1f} req/s)")
         self.active = False
     
+    def run_continuous_simulation_sync(self, out_queue: queue.Queue, target_rps: int = 200,
+                                       duration_seconds: int = 60) -> None:
+        """
+        Blocking variant of run_continuous_simulation for synchronous consumers.
+        Pushes each sub-batch onto out_queue, followed by None once finished.
+        """
+        self.active = True
+        self.start_time = time.time()
+        self.total_requests = 0
+        
+        interval = self.TICK_INTERVAL
+        sub_batches = self._tick_sub_batches(target_rps)
+        ticks_per_second = len(sub_batches)
+        
+        print(f"🚀 Starting sync simulation: {target_rps} req/sec target for {duration_seconds}s")
+        
+        end_time = time.time() + duration_seconds
+        next_tick = time.monotonic()
+        tick = 0
+        generated_since_report = 0
+        
+        try:
+            while self.active and time.time() < end_time:
+                sub_batch = sub_batches[tick % ticks_per_second]
+                if sub_batch:
+                    requests = self.generate_batch_sync(sub_batch)
+                    out_queue.put(requests)
+                    generated_since_report += len(requests)
+                
+                tick += 1
+                if tick % ticks_per_second == 0:
+                    elapsed = time.time() - self.start_time
+                    current_rps = self.total_requests / elapsed if elapsed > 0 else 0
+                    print(f"⚡ Generated {generated_since_report} requests | Total: {self.total_requests} | Speed: {current_rps:.1f} req/s")
+                    generated_since_report = 0
+                
+                # Drift-corrected sleep to the next tick
+                next_tick += interval
+                time.sleep(max(0, next_tick - time.monotonic()))
+        finally:
+            out_queue.put(None)  # Sentinel: no more batches
+            elapsed_total = time.time() - self.start_time
+            final_rps = self.total_requests / elapsed_total if elapsed_total > 0 else 0
+            print(f"✅ Simulation complete: {self.total_requests} requests in {elapsed_total:.1f}s ({final_rps:.1f} req/s)")
+            self.active = False
+    
+    def start_sync_simulation_thread(self, target_rps: int = 200, duration_seconds: int = 60,
+                                     out_queue: Optional[queue.Queue] = None) -> Tuple[threading.Thread, queue.Queue]:
+        """Run run_continuous_simulation_sync in a daemon thread; returns (thread, queue)"""
+        if out_queue is None:
+            out_queue = queue.Queue()
+        thread = threading.Thread(
+            target=self.run_continuous_simulation_sync,
+            args=(out_queue, target_rps, duration_seconds),
+            daemon=True
+        )
+        thread.start()
+        return thread, out_queue
+    
     def stop(self):
         """Stop the simulation"""
         self.active = False
@@ -5,7 +5,38 @@ NO pre-labeled anomaly types - ML models determine the anomaly category
 """
 import random
 import time
-from typing import Dict, List
+from dataclasses import asdict, dataclass, replace
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class PatternSpec:
+    """Sampling ranges for one traffic behaviour (payload bounds are inclusive)"""
+    status_pool: Tuple[int, ...]
+    lat_lo: float
+    lat_hi: float
+    payload_lo: int
+    payload_hi: int
+    ua_pool: Tuple[str, ...]
+    methods: Tuple[str, ...] = ()  # Empty = endpoint's default method
+
+
+@dataclass(slots=True)
+class TrafficRequest:
+    """A single generated request (slotted: smaller and faster than a dict)"""
+    method: str
+    path: str
+    status: int
+    latency: float
+    payload_size: int
+    user_agent: str
+    parameters: Dict
+    timestamp: float
+    
+    def to_dict(self):
+        return asdict(self)
 
 
 class AutoDetectionTrafficGenerator:
@@ -38,11 +69,30 @@ class AutoDetectionTrafficGenerator:
         'scanner/2.0'
     ]
     
+    HTTP_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+    
+    # Per-pattern sampling specs
+    NORMAL_SPEC = PatternSpec((200, 200, 200, 201), 0.05, 0.3, 100, 800,  # Mostly 200, 50-300ms
+                              tuple(USER_AGENTS[:6]))  # Normal browsers
+    BURST_SPEC = PatternSpec((200, 429, 503, 503), 0.001, 0.02, 50, 200,  # Rate limits, 1-20ms
+                             tuple(USER_AGENTS), ('POST',))
+    LARGE_PAYLOAD_SPEC = PatternSpec((200, 413, 400), 0.5, 2.0, 8000, 50000,
+                                     tuple(USER_AGENTS), ('POST',))
+    SMALL_PAYLOAD_SPEC = PatternSpec((200,), 0.05, 0.3, 100, 800,
+                                     tuple(USER_AGENTS), ('POST',))
+    ERROR_SPEC = PatternSpec((400, 401, 403, 404, 500), 0.02, 0.15, 0, 300,
+                             tuple(USER_AGENTS), HTTP_METHODS)
+    PROBE_OK_SPEC = replace(ERROR_SPEC, status_pool=(200,))
+    BOT_SPEC = PatternSpec((200, 401, 403), 0.03, 0.12, 200, 400,  # Consistent timing and size
+                           ('bot/1.0',), ('POST',))
+    BOT_AGENTS = ('bot/1.0', 'scanner/2.0', 'automated-tool')
+    
     def __init__(self):
         self.pattern_counter = 0
         self.session_params = {}  # For simulating repeated params
+        self._rng = np.random.default_rng()
     
-    def generate_traffic(self, simulated_endpoint: str, count: int = 10) -> List[Dict]:
+    def generate_traffic(self, simulated_endpoint: str, count: int = 10) -> List[TrafficRequest]:
         """
         Generate mixed traffic patterns for a single endpoint.
         
@@ -59,116 +109,114 @@ class AutoDetectionTrafficGenerator:
             count: Number of requests to generate
         
         Returns:
-            List of request dictionaries
+            List of TrafficRequest objects
         """
         if simulated_endpoint not in self.VIRTUAL_ENDPOINTS:
             raise ValueError(f"Invalid endpoint. Must be one of: {self.VIRTUAL_ENDPOINTS}")
         
         requests = []
+        now = time.time()  # One clock read shared by the whole batch
         
         # Decide traffic pattern for this batch
         pattern_choice = random.random()
         
         if pattern_choice < 0.40:
             # 40% Normal baseline traffic
-            requests = self._generate_normal_baseline(simulated_endpoint, count)
+            requests = self._generate_normal_baseline(simulated_endpoint, count, now)
         elif pattern_choice < 0.55:
             # 15% Rate burst (DDoS-like)
-            requests = self._generate_rate_burst(simulated_endpoint, count)
+            requests = self._generate_rate_burst(simulated_endpoint, count, now)
         elif pattern_choice < 0.70:
             # 15% Large payloads (data exfiltration)
-            requests = self._generate_payload_variation(simulated_endpoint, count)
+            requests = self._generate_payload_variation(simulated_endpoint, count, now)
         elif pattern_choice < 0.80:
             # 10% Error-prone (scanning/probing)
-            requests = self._generate_error_pattern(simulated_endpoint, count)
+            requests = self._generate_error_pattern(simulated_endpoint, count, now)
         elif pattern_choice < 0.90:
             # 10% Bot-like (repeated params)
-            requests = self._generate_bot_pattern(simulated_endpoint, count)
+            requests = self._generate_bot_pattern(simulated_endpoint, count, now)
         else:
             # 10% Mixed anomalies
-            requests = self._generate_mixed_patterns(simulated_endpoint, count)
+            requests = self._generate_mixed_patterns(simulated_endpoint, count, now)
         
         self.pattern_counter += 1
         return requests
     
-    def _generate_normal_baseline(self, endpoint: str, count: int) -> List[Dict]:
+    def _sample_columns(self, endpoint: str, n: int, spec: PatternSpec) -> Dict[str, np.ndarray]:
+        """Draw all per-request fields for n requests in bulk"""
+        rng = self._rng
+        methods = spec.methods or (
+            'POST' if endpoint in ['/sim/login', '/sim/payment', '/sim/signup'] else 'GET',
+        )
+        return {
+            'method': rng.choice(methods, size=n),
+            'status': rng.choice(spec.status_pool, size=n),
+            'latency': rng.uniform(spec.lat_lo, spec.lat_hi, size=n),
+            'payload_size': rng.integers(spec.payload_lo, spec.payload_hi + 1, size=n),
+            'user_agent': rng.choice(spec.ua_pool, size=n),
+        }
+    
+    def _sample_mixed_columns(self, endpoint: str, n: int, mask: np.ndarray,
+                              spec_true: PatternSpec, spec_false: PatternSpec) -> Dict[str, np.ndarray]:
+        """Draw columns from spec_true where mask is set, spec_false elsewhere"""
+        a = self._sample_columns(endpoint, n, spec_true)
+        b = self._sample_columns(endpoint, n, spec_false)
+        return {key: np.where(mask, a[key], b[key]) for key in a}
+    
+    def _build_requests(self, endpoint: str, columns: Dict[str, np.ndarray],
+                        parameters: Union[Dict, List[Dict]], now: Optional[float] = None) -> List[TrafficRequest]:
+        """
+        Build TrafficRequest objects from bulk-sampled columns, all stamped with
+        `now`. `parameters` is one params dict per request, or a single dict
+        shared by all of them.
+        """
+        # tolist() yields native Python str/int/float values
+        methods = columns['method'].tolist()
+        statuses = columns['status'].tolist()
+        latencies = columns['latency'].tolist()
+        payloads = columns['payload_size'].tolist()
+        agents = columns['user_agent'].tolist()
+        shared = isinstance(parameters, dict)
+        if now is None:
+            now = time.time()
+        return [TrafficRequest(
+            methods[i],
+            endpoint,
+            statuses[i],
+            latencies[i],
+            payloads[i],
+            agents[i],
+            parameters if shared else parameters[i],
+            now
+        ) for i in range(len(statuses))]
+    
+    def _generate_normal_baseline(self, endpoint: str, count: int, now: Optional[float] = None) -> List[TrafficRequest]:
         """Generate normal, clean baseline traffic"""
-        requests = []
-        for i in range(count):
-            requests.append({
-                'method': 'POST' if endpoint in ['/sim/login', '/sim/payment', '/sim/signup'] else 'GET',
-                'path': endpoint,
-                'status': random.choice([200, 200, 200, 201]),  # Mostly 200
-                'latency': random.uniform(0.05, 0.3),  # Normal latency (50-300ms)
-                'payload_size': random.randint(100, 800),  # Small payloads
-                'user_agent': random.choice(self.USER_AGENTS[:6]),  # Normal browsers
-                'parameters': self._generate_varied_params(i),
-                'timestamp': time.time()
-            })
-        return requests
+        columns = self._sample_columns(endpoint, count, self.NORMAL_SPEC)
+        return self._build_requests(endpoint, columns, [self._generate_varied_params(i, now) for i in range(count)], now)
     
-    def _generate_rate_burst(self, endpoint: str, count: int) -> List[Dict]:
+    def _generate_rate_burst(self, endpoint: str, count: int, now: Optional[float] = None) -> List[TrafficRequest]:
         """Generate high-rate traffic burst (DDoS pattern)"""
-        requests = []
-        # Generate MORE requests to simulate burst
         actual_count = count * 3  # 3x multiplier for rate spike
-        
-        for i in range(actual_count):
-            requests.append({
-                'method': 'POST',
-                'path': endpoint,
-                'status': random.choice([200, 429, 503, 503]),  # More rate limits
-                'latency': random.uniform(0.001, 0.02),  # Very fast (1-20ms)
-                'payload_size': random.randint(50, 200),  # Small payloads
-                'user_agent': random.choice(self.USER_AGENTS),
-                'parameters': {'burst_id': i, 'wave': self.pattern_counter},
-                'timestamp': time.time()
-            })
-        return requests
+        columns = self._sample_columns(endpoint, actual_count, self.BURST_SPEC)
+        wave = self.pattern_counter
+        return self._build_requests(endpoint, columns, [{'burst_id': i, 'wave': wave} for i in range(actual_count)], now)
     
-    def _generate_payload_variation(self, endpoint: str, count: int) -> List[Dict]:
+    def _generate_payload_variation(self, endpoint: str, count: int, now: Optional[float] = None) -> List[TrafficRequest]:
         """Generate traffic with large payload variations"""
-        requests = []
-        for i in range(count):
-            # Mix of normal and large payloads
-            is_large = random.random() < 0.7  # 70% large payloads
-            
-            requests.append({
-                'method': 'POST',
-                'path': endpoint,
-                'status': random.choice([200, 413, 400]) if is_large else 200,
-                'latency': random.uniform(0.5, 2.0) if is_large else random.uniform(0.05, 0.3),
-                'payload_size': random.randint(8000, 50000) if is_large else random.randint(100, 800),
-                'user_agent': random.choice(self.USER_AGENTS),
-                'parameters': {'data_size': 'large' if is_large else 'normal'},
-                'timestamp': time.time()
-            })
-        return requests
+        is_large = self._rng.random(count) < 0.7  # 70% large payloads
+        columns = self._sample_mixed_columns(endpoint, count, is_large, self.LARGE_PAYLOAD_SPEC, self.SMALL_PAYLOAD_SPEC)
+        return self._build_requests(endpoint, columns, [{'data_size': 'large' if large else 'normal'} for large in is_large], now)
     
-    def _generate_error_pattern(self, endpoint: str, count: int) -> List[Dict]:
+    def _generate_error_pattern(self, endpoint: str, count: int, now: Optional[float] = None) -> List[TrafficRequest]:
         """Generate traffic with high error rate (scanning/probing)"""
-        requests = []
-        error_rate = 0.75  # 75% errors
-        
-        for i in range(count):
-            is_error = random.random() < error_rate
-            
-            requests.append({
-                'method': random.choice(['GET', 'POST', 'PUT', 'DELETE']),
-                'path': endpoint,
-                'status': random.choice([400, 401, 403, 404, 500]) if is_error else 200,
-                'latency': random.uniform(0.02, 0.15),
-                'payload_size': random.randint(0, 300),
-                'user_agent': random.choice(self.USER_AGENTS),
-                'parameters': {'probe': f'scan_{i}', 'test': random.randint(1, 100)},
-                'timestamp': time.time()
-            })
-        return requests
+        is_error = self._rng.random(count) < 0.75  # 75% errors
+        columns = self._sample_mixed_columns(endpoint, count, is_error, self.ERROR_SPEC, self.PROBE_OK_SPEC)
+        tests = self._rng.integers(1, 101, size=count)
+        return self._build_requests(endpoint, columns, [{'probe': f'scan_{i}', 'test': test} for i, test in enumerate(tests.tolist())], now)
     
-    def _generate_bot_pattern(self, endpoint: str, count: int) -> List[Dict]:
+    def _generate_bot_pattern(self, endpoint: str, count: int, now: Optional[float] = None) -> List[TrafficRequest]:
         """Generate bot-like traffic (repeated parameters, low entropy)"""
-        requests = []
-        
         # Use SAME parameters for all requests (bot signature)
         if endpoint not in self.session_params:
             self.session_params[endpoint] = {
@@ -177,50 +225,43 @@ class AutoDetectionTrafficGenerator:
                 'token': f'tok_{random.randint(100000, 999999)}'
             }
         
-        repeated_params = self.session_params[endpoint]
-        bot_agent = random.choice(['bot/1.0', 'scanner/2.0', 'automated-tool'])
-        
-        for i in range(count):
-            requests.append({
-                'method': 'POST',
-                'path': endpoint,
-                'status': random.choice([200, 401, 403]),
-                'latency': random.uniform(0.03, 0.12),  # Consistent timing
-                'payload_size': random.randint(200, 400),  # Consistent size
-                'user_agent': bot_agent,  # SAME agent
-                'parameters': repeated_params,  # SAME params
-                'timestamp': time.time()
-            })
-        return requests
+        spec = replace(self.BOT_SPEC, ua_pool=(random.choice(self.BOT_AGENTS),))  # SAME agent
+        columns = self._sample_columns(endpoint, count, spec)
+        return self._build_requests(endpoint, columns, self.session_params[endpoint], now)  # SAME params
     
-    def _generate_mixed_patterns(self, endpoint: str, count: int) -> List[Dict]:
+    def _generate_mixed_patterns(self, endpoint: str, count: int, now: Optional[float] = None) -> List[TrafficRequest]:
         """Generate mixed anomaly patterns in one batch"""
-        requests = []
+        if now is None:
+            now = time.time()
         
-        for i in range(count):
-            # Randomly select a pattern for each request
-            pattern = random.choice(['rate', 'payload', 'error', 'bot'])
-            
-            if pattern == 'rate':
-                req = self._generate_rate_burst(endpoint, 1)[0]
-            elif pattern == 'payload':
-                req = self._generate_payload_variation(endpoint, 1)[0]
-            elif pattern == 'error':
-                req = self._generate_error_pattern(endpoint, 1)[0]
-            else:  # bot
-                req = self._generate_bot_pattern(endpoint, 1)[0]
-            
-            requests.append(req)
+        # Assign each request a pattern (rate/payload/error/bot) up front,
+        # then run each sub-generator once for its share
+        rate_n, payload_n, error_n, bot_n = np.bincount(self._rng.integers(0, 4, size=count), minlength=4).tolist()
         
+        # One burst-style request per slot (no 3x rate multiplier inside a mix)
+        wave = self.pattern_counter
+        rate_reqs = self._build_requests(
+            endpoint,
+            self._sample_columns(endpoint, rate_n, self.BURST_SPEC),
+            [{'burst_id': i, 'wave': wave} for i in range(rate_n)],
+            now
+        )
+        requests = (
+            rate_reqs
+            + self._generate_payload_variation(endpoint, payload_n, now)
+            + self._generate_error_pattern(endpoint, error_n, now)
+            + (self._generate_bot_pattern(endpoint, bot_n, now) if bot_n else [])
+        )
+        random.shuffle(requests)
         return requests
     
-    def _generate_varied_params(self, index: int) -> Dict:
+    def _generate_varied_params(self, index: int, now: Optional[float] = None) -> Dict:
         """Generate varied parameters for normal traffic"""
         return {
             'user_id': f'user_{random.randint(1000, 9999)}',
             'session': f'sess_{random.randint(10000, 99999)}',
             'request_id': f'req_{index}_{random.randint(100, 999)}',
-            'timestamp': int(time.time())
+            'timestamp': int(time.time() if now is None else now)
         }
 
 
@@ -90,11 +90,10 @@ try:
     current_count = db.query(AnomalyLog).count()
     print(f"Current anomalies in DB: {current_count}")
     
-    # Add test anomalies
+    # Add test anomalies in one batched INSERT / single transaction
+    db.bulk_save_objects([AnomalyLog(**data) for data in test_anomalies])
+    db.commit()
     for i, data in enumerate(test_anomalies, 1):
-        anomaly = AnomalyLog(**data)
-        db.add(anomaly)
-        db.commit()
         print(f"✅ Created test anomaly #{i}: {data['endpoint']} (Error: {data['error_rate']*100}%, Latency: {data['avg_response_time']}ms)")
     
     total = db.query(AnomalyLog).count()
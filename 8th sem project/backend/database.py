@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import create_engine, make_url, event, Column, Integer, String, Float, DateTime, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -6,10 +6,32 @@ import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./api_logs.db")
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+_url = make_url(DATABASE_URL)
+if _url.get_backend_name() == "postgresql":
+    # Small fixed pool for the long-lived simulation/detection sessions; with
+    # psycopg2, batch executemany through execute_values / execute_batch
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=4,
+        pool_pre_ping=False,
+        **({"executemany_mode": "values_plus_batch"} if _url.get_driver_name() == "psycopg2" else {})
+    )
+else:
+    engine = create_engine(
+        DATABASE_URL, 
+        connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    )
+
+if "sqlite" in DATABASE_URL:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL + NORMAL sync: readers don't block writers and commits skip most fsyncs
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -26,7 +48,12 @@ class APILog(Base):
     payload_size = Column(Integer)
     ip_address = Column(String)
     user_id = Column(String, nullable=True)
-    is_simulation = Column(Boolean, default=False, index=True)  # Separate live from simulation
+    is_simulation = Column(Boolean, default=False)  # Separate live from simulation
+
+    # Matches the window queries: is_simulation = ? AND timestamp range [AND endpoint = ?]
+    __table_args__ = (
+        Index("ix_api_logs_sim_ts_ep", "is_simulation", "timestamp", "endpoint"),
+    )
 
 
 class AnomalyLog(Base):
@@ -54,11 +81,19 @@ class AnomalyLog(Base):
     severity = Column(String(20), nullable=True)
     duration_seconds = Column(Float, nullable=True)
     impact_score = Column(Float, nullable=True)
-    is_simulation = Column(Boolean, default=False, index=True)  # Separate live from simulation
+    is_simulation = Column(Boolean, default=False)  # Separate live from simulation
+
+    __table_args__ = (
+        Index("ix_anomaly_logs_sim_ts", "is_simulation", "timestamp"),
+    )
 
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes on tables that already exist (older databases)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 
 def get_db():
@@ -3,14 +3,381 @@ Multi-Dataset Manager for API Security ML Training.
 Downloads, processes, and manages multiple real-world security datasets.
 """
 import os
+import hashlib
+import mmap
+import shutil
 import requests
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 import re
-from collections import Counter
-import math
+import orjson
+
+
+# HTTP request line: METHOD PATH HTTP/x.y (anchored; used with .match())
+_REQUEST_LINE_RE = re.compile(r'\A(\w+)\s+(\S+)\s+HTTP')
+_LEADING_SPACE_RE = re.compile(r'\s*')
+
+# Attack indicators as fixed lowercase literals: SQL injection, XSS, path
+# traversal, SQL functions, command injection. union...select is the only
+# true pattern; its gap is bounded so attacker-controlled input can't force
+# an unbounded scan per "union" occurrence.
+_ATTACK_TOKENS = (
+    "%27", "'", "--", "%23", "#",
+    "<script", "javascript:", "onerror=", "onload=",
+    "../", "..\\",
+    "concat(", "char(",
+    "exec(", "eval(", "system(",
+)
+_UNION_SELECT_RE = re.compile(r"union.{0,200}select")
+
+# Optional: pyahocorasick scans for all literal tokens in a single linear pass
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+def _build_attack_automaton():
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for token in _ATTACK_TOKENS:
+        automaton.add_word(token, token)
+    automaton.make_automaton()
+    return automaton
+
+
+_ATTACK_AUTOMATON = _build_attack_automaton()
+
+
+def has_attack_indicator(endpoint):
+    """True if the request target contains any known attack signature"""
+    return _has_attack_indicator_lowered(endpoint.lower())
+
+
+def _has_attack_indicator_lowered(lowered):
+    """has_attack_indicator() for a target that is already lowercased"""
+    if _ATTACK_AUTOMATON is not None:
+        if next(_ATTACK_AUTOMATON.iter(lowered), None) is not None:
+            return True
+    elif any(token in lowered for token in _ATTACK_TOKENS):
+        return True
+    return 'union' in lowered and _UNION_SELECT_RE.search(lowered) is not None
+
+
+WINDOW_FEATURE_COLUMNS = [
+    'req_count', 'error_rate', 'avg_response_time', 'max_response_time',
+    'payload_mean', 'unique_endpoints', 'repeat_rate', 'status_entropy'
+]
+
+# Compact in-memory / on-disk dtypes for the window features
+WINDOW_FEATURE_DTYPES = {
+    'req_count': np.int32,
+    'error_rate': np.float32,
+    'avg_response_time': np.float32,
+    'max_response_time': np.float32,
+    'payload_mean': np.float32,
+    'unique_endpoints': np.int32,
+    'repeat_rate': np.float32,
+    'status_entropy': np.float32,
+}
+
+_INTEGER_FEATURES = np.array([np.issubdtype(WINDOW_FEATURE_DTYPES[c], np.integer) for c in WINDOW_FEATURE_COLUMNS])
+
+# Synthetic traffic classes: (share of samples, per-feature low, per-feature high)
+# in WINDOW_FEATURE_COLUMNS order; integer features are drawn from [low, high)
+_SYNTHETIC_USER_CLASSES = (
+    # Normal users (60%)
+    (0.6, [5, 0.0, 50, 150, 100, 2, 0.2, 0.5], [50, 0.1, 200, 400, 500, 6, 0.6, 1.2]),
+    # Power users (25%)
+    (0.25, [100, 0.05, 150, 300, 200, 3, 0.4, 0.4], [300, 0.25, 400, 800, 800, 5, 0.7, 0.9]),
+    # Attackers / Bots (15%)
+    (0.15, [400, 0.4, 300, 800, 500, 1, 0.85, 0.1], [1500, 0.95, 1500, 3000, 2000, 2, 1.0, 0.5]),
+)
+
+# Optional: pyarrow enables a compressed Parquet copy next to each CSV
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Optional: Numba compiles the per-window feature kernel to native code
+try:
+    import numba
+except ImportError:
+    numba = None
+
+_window_features_kernel = None
+if numba is not None:
+    @numba.njit(cache=True, parallel=True)
+    def _window_features_kernel(status_ids, n_statuses, is_error, response_times, payloads,
+                                endpoint_ids, n_endpoints, window_size, out):
+        """Fill out[w] with the 8 WINDOW_FEATURE_COLUMNS for each fixed-size window"""
+        n = status_ids.shape[0]
+        for w in numba.prange(out.shape[0]):
+            start = w * window_size
+            end = min(start + window_size, n)
+            count = end - start
+            
+            status_hist = np.zeros(n_statuses, dtype=np.int64)
+            endpoint_hist = np.zeros(n_endpoints, dtype=np.int64)
+            errors = 0
+            rt_sum = 0.0
+            rt_max = response_times[start]
+            payload_sum = 0.0
+            for i in range(start, end):
+                status_hist[status_ids[i]] += 1
+                endpoint_hist[endpoint_ids[i]] += 1
+                if is_error[i]:
+                    errors += 1
+                rt_sum += response_times[i]
+                if response_times[i] > rt_max:
+                    rt_max = response_times[i]
+                payload_sum += payloads[i]
+            
+            unique_endpoints = 0
+            top_endpoint = 0
+            for c in endpoint_hist:
+                if c > 0:
+                    unique_endpoints += 1
+                if c > top_endpoint:
+                    top_endpoint = c
+            
+            entropy = 0.0
+            for c in status_hist:
+                if c > 0:
+                    p = c / count
+                    entropy -= p * np.log2(p)
+            
+            out[w, 0] = count
+            out[w, 1] = errors / count
+            out[w, 2] = rt_sum / count
+            out[w, 3] = rt_max
+            out[w, 4] = payload_sum / count
+            out[w, 5] = unique_endpoints
+            out[w, 6] = top_endpoint / count
+            out[w, 7] = entropy
+
+
+def _window_histogram(window_ids, codes, n_windows):
+    """Count occurrences of each integer code per window -> (n_windows, n_codes) array"""
+    n_codes = int(codes.max()) + 1
+    flat = np.bincount(window_ids * n_codes + codes, minlength=n_windows * n_codes)
+    return flat.reshape(n_windows, n_codes)
+
+
+def _histogram_entropy(counts):
+    """Row-wise Shannon entropy (bits) of a count matrix"""
+    probs = counts / counts.sum(axis=1, keepdims=True)
+    logs = np.log2(probs, out=np.zeros_like(probs), where=probs > 0)
+    return -(probs * logs).sum(axis=1)
+
+
+TEMPORAL_FEATURE_COLUMNS = [
+    'std_response_time', 'median_response_time', 'iqr_response_time',
+    'skew_response_time', 'kurtosis_response_time'
+]
+
+
+def _window_starts(n_windows):
+    """Synthetic window timestamps, one minute apart counting back from now"""
+    return pd.Timestamp(datetime.utcnow()) - pd.to_timedelta(np.arange(n_windows), unit='m')
+
+
+def _sliding_window_runs(codes, window_size, stride):
+    """
+    Occurrence counts of each integer code present in the windows starting
+    every `stride` items -> (window index, count) arrays, one entry per
+    distinct code in each window, grouped by window. Only codes that occur
+    are counted, so memory is O(n_windows * window_size) whatever the number
+    of distinct codes.
+    """
+    rows = np.sort(np.lib.stride_tricks.sliding_window_view(codes, window_size)[::stride], axis=1)
+    new_run = np.ones(rows.shape, dtype=bool)
+    new_run[:, 1:] = rows[:, 1:] != rows[:, :-1]
+    run_starts = np.flatnonzero(new_run)
+    return run_starts // window_size, np.diff(run_starts, append=rows.size)
+
+
+def _run_entropy(window_ids, counts, window_size, n_windows):
+    """Per-window Shannon entropy (bits) from _sliding_window_runs() output"""
+    probs = counts / window_size
+    return -np.bincount(window_ids, weights=probs * np.log2(probs), minlength=n_windows)
+
+
+def _sliding_window_features(columns, window_size, stride):
+    """
+    Window features over `window_size`-request windows starting every
+    `stride` requests. Windows are zero-copy views of the request arrays;
+    endpoint and status histograms only hold the codes each window contains.
+    """
+    n = len(columns['endpoint_id'])
+    if n < window_size or window_size < 5:
+        return pd.DataFrame()
+    
+    def windows(values):
+        return np.lib.stride_tricks.sliding_window_view(values, window_size)[::stride]
+    
+    response_times = windows(columns['response_time_ms'].astype(np.float64))
+    status_ids = pd.factorize(columns['status_code'])[0]
+    n_windows = len(response_times)
+    endpoint_windows, endpoint_counts = _sliding_window_runs(columns['endpoint_id'], window_size, stride)
+    status_windows, status_counts = _sliding_window_runs(status_ids, window_size, stride)
+    endpoint_window_starts = np.flatnonzero(np.diff(endpoint_windows, prepend=-1))
+    
+    out = np.empty((n_windows, len(WINDOW_FEATURE_COLUMNS) + len(TEMPORAL_FEATURE_COLUMNS)))
+    out[:, 0] = window_size
+    out[:, 1] = windows(columns['status_code'] >= 400).mean(axis=1)
+    out[:, 2] = response_times.mean(axis=1)
+    out[:, 3] = response_times.max(axis=1)
+    out[:, 4] = windows(columns['payload_size']).mean(axis=1)
+    out[:, 5] = np.bincount(endpoint_windows, minlength=n_windows)
+    out[:, 6] = np.maximum.reduceat(endpoint_counts, endpoint_window_starts) / window_size
+    out[:, 7] = _run_entropy(status_windows, status_counts, window_size, n_windows)
+    
+    # Temporal statistics of response time within each window
+    centered = response_times - out[:, 2:3]
+    var = (centered ** 2).mean(axis=1)
+    q25, median, q75 = np.percentile(response_times, [25, 50, 75], axis=1)
+    out[:, 8] = np.sqrt(var)
+    out[:, 9] = median
+    out[:, 10] = q75 - q25
+    out[:, 11] = np.divide((centered ** 3).mean(axis=1), var ** 1.5, out=np.zeros_like(var), where=var > 0)
+    out[:, 12] = np.divide((centered ** 4).mean(axis=1), var ** 2, out=np.full_like(var, 3.0), where=var > 0) - 3.0
+    
+    features = pd.DataFrame(out, columns=WINDOW_FEATURE_COLUMNS + TEMPORAL_FEATURE_COLUMNS)
+    features = features.astype(WINDOW_FEATURE_DTYPES).astype({c: np.float32 for c in TEMPORAL_FEATURE_COLUMNS})
+    features['window_start'] = _window_starts(len(features))
+    return features
+
+
+# Per-request fields kept as parallel arrays, with their in-memory dtypes
+_REQUEST_COLUMN_DTYPES = (
+    ('payload_size', np.int32),
+    ('is_attack', bool),
+    ('status_code', np.int16),
+    ('response_time_ms', np.float32),
+)
+
+
+def requests_to_columns(request_list):
+    """
+    Convert a list of request dicts into parallel NumPy arrays (struct of
+    arrays). Endpoints are factorized to integer ids. An empty list yields
+    empty arrays for every column.
+    """
+    n = len(request_list)
+    first = request_list[0] if n else {}
+    endpoints = np.array([r['endpoint'] for r in request_list], dtype=object)
+    columns = {'endpoint_id': pd.factorize(endpoints)[0]}
+    for key, dtype in _REQUEST_COLUMN_DTYPES:
+        if key in first or n == 0:
+            columns[key] = np.fromiter((r[key] for r in request_list), dtype=dtype, count=n)
+    return columns
+
+
+def window_feature_matrix(columns, window_size):
+    """
+    (n_windows, 8) matrix of WINDOW_FEATURE_COLUMNS for consecutive
+    `window_size`-request windows over requests_to_columns() arrays.
+    The last window may be partial; callers drop the ones too small to use.
+    """
+    status = columns['status_code']
+    response_times = columns['response_time_ms']
+    payloads = columns['payload_size']
+    endpoint_ids = columns['endpoint_id']
+    is_error = status >= 400
+    n = len(endpoint_ids)
+    
+    window_ids = np.arange(n) // window_size
+    n_windows = int(window_ids[-1]) + 1
+    status_ids, status_values = pd.factorize(status)
+    
+    # Both paths fill one preallocated (n_windows, 8) matrix in WINDOW_FEATURE_COLUMNS order
+    out = np.empty((n_windows, len(WINDOW_FEATURE_COLUMNS)))
+    if _window_features_kernel is not None:
+        # Native single pass over all windows (Numba)
+        _window_features_kernel(
+            status_ids, len(status_values), is_error, response_times, payloads,
+            endpoint_ids, int(endpoint_ids.max()) + 1, window_size, out
+        )
+    else:
+        # Features 1-5: count, error rate, response times, payload
+        starts = np.arange(0, n, window_size)
+        req_count = np.bincount(window_ids)
+        out[:, 0] = req_count
+        out[:, 1] = np.bincount(window_ids, weights=is_error) / req_count
+        out[:, 2] = np.bincount(window_ids, weights=response_times) / req_count
+        out[:, 3] = np.maximum.reduceat(response_times, starts)
+        out[:, 4] = np.bincount(window_ids, weights=payloads) / req_count
+        
+        # Features 6 & 7: unique endpoints and repeat rate from a per-window endpoint histogram
+        endpoint_counts = _window_histogram(window_ids, endpoint_ids, n_windows)
+        out[:, 5] = (endpoint_counts > 0).sum(axis=1)
+        out[:, 6] = endpoint_counts.max(axis=1) / req_count
+        
+        # Feature 8: Status code entropy from a per-window status histogram
+        status_counts = _window_histogram(window_ids, status_ids, n_windows)
+        out[:, 7] = _histogram_entropy(status_counts)
+    
+    return out
+
+
+# Blank line(s) between requests in a CSIC dump (LF or CRLF, whitespace-only lines count as blank)
+_BLOCK_SEPARATOR_RE = re.compile(rb'\r?\n(?:[ \t]*\r?\n)+')
+
+
+def _decode_block(raw):
+    return raw.decode('latin-1').replace('\r\n', '\n').strip('\n')
+
+
+def iter_http_blocks(path, limit=None):
+    """
+    Memory-map a CSIC dump and yield its blank-line separated blocks,
+    decoding each one only when it is yielded; stops after `limit`
+    non-empty blocks.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    
+    count = 0
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = 0
+        separators = _BLOCK_SEPARATOR_RE.finditer(mm)
+        try:
+            for sep in separators:
+                raw = mm[pos:sep.start()]
+                pos = sep.end()
+                if raw.strip():
+                    yield _decode_block(raw)
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+            raw = mm[pos:]
+            if raw.strip():
+                yield _decode_block(raw)
+        finally:
+            # Release the match iterator's buffer export before the map is closed
+            del separators
+
+
+def _parse_csic_file(path, is_malicious, limit):
+    """
+    Parse up to `limit` requests from one CSIC dump. Returns (parsed
+    requests, error message or None); requests parsed before an error
+    are kept.
+    """
+    parsed_requests = []
+    try:
+        for req_text in iter_http_blocks(path, limit=limit):
+            parsed = SecurityDatasetManager.parse_http_request_to_features(req_text, is_malicious=is_malicious)
+            if parsed:
+                parsed_requests.append(parsed)
+    except Exception as e:
+        return parsed_requests, str(e)
+    return parsed_requests, None
 
 
 class SecurityDatasetManager:
@@ -21,6 +388,7 @@ class SecurityDatasetManager:
         os.makedirs(self.base_dir, exist_ok=True)
         self.processed_dir = os.path.join(self.base_dir, 'processed')
         os.makedirs(self.processed_dir, exist_ok=True)
+        self.rng = np.random.default_rng()
         
     def fetch_csic_http_dataset(self):
         """
@@ -46,29 +414,110 @@ class SecurityDatasetManager:
         downloaded_files = {}
         
         for traffic_type, info in dataset_info.items():
-            if os.path.exists(info['path']):
+            if os.path.exists(info['path']) and not os.path.exists(info['path'] + '.etag'):
                 print(f"✅ {traffic_type.capitalize()} already exists")
                 downloaded_files[traffic_type] = info['path']
                 continue
             
             try:
                 print(f"📥 Downloading {traffic_type}...")
-                resp = requests.get(info['url'], timeout=90)
-                resp.raise_for_status()
-                
-                with open(info['path'], 'wb') as f:
-                    f.write(resp.content)
-                
-                size_mb = os.path.getsize(info['path']) / (1024*1024)
-                print(f"✅ {traffic_type.capitalize()} downloaded ({size_mb:.1f} MB)")
+                if self._download_file(info['url'], info['path']):
+                    size_mb = os.path.getsize(info['path']) / (1024*1024)
+                    print(f"✅ {traffic_type.capitalize()} downloaded ({size_mb:.1f} MB)")
+                else:
+                    print(f"✅ {traffic_type.capitalize()} unchanged on server, using cached copy")
                 downloaded_files[traffic_type] = info['path']
                 
             except Exception as err:
-                print(f"❌ Failed to download {traffic_type}: {err}")
-                downloaded_files[traffic_type] = None
+                if os.path.exists(info['path']):
+                    print(f"⚠️  Could not revalidate {traffic_type} ({err}), using cached copy")
+                    downloaded_files[traffic_type] = info['path']
+                else:
+                    print(f"❌ Failed to download {traffic_type}: {err}")
+                    downloaded_files[traffic_type] = None
         
         return downloaded_files
     
+    def _download_file(self, url, path):
+        """
+        Stream a download to disk in fixed-size chunks.
+        Resumes a partial `.part` file via a Range request and revalidates an
+        existing file with the ETag / Last-Modified stored in a `.etag` sidecar.
+        Returns False if the server reports the cached file is unchanged.
+        """
+        part_path = path + '.part'
+        meta_path = path + '.etag'
+        # Resume offsets count bytes as sent, so ask for the body unencoded
+        headers = {'Accept-Encoding': 'identity'}
+        
+        resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if resume_from:
+            headers['Range'] = f'bytes={resume_from}-'
+        elif os.path.exists(path) and os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        
+        with requests.get(url, headers=headers, timeout=90, stream=True) as resp:
+            if resp.status_code == 304:
+                return False
+            encoded = resp.headers.get('Content-Encoding', 'identity').lower() != 'identity'
+            if resume_from and (resp.status_code == 416 or (resp.status_code == 206 and encoded)):
+                # 416: the .part already covers the whole (or a changed) file.
+                # Encoded 206: its offsets don't match the decoded .part.
+                # Either way the .part can't be resumed; start a fresh download.
+                resp.close()
+                os.remove(part_path)
+                return self._download_file(url, path)
+            resp.raise_for_status()
+            
+            # 206 = server honoured the Range header; anything else restarts.
+            # Identity bodies are copied byte for byte; an encoded body is
+            # decoded and its .part discarded on failure, since it can't be resumed.
+            mode = 'ab' if resp.status_code == 206 else 'wb'
+            resp.raw.decode_content = encoded
+            try:
+                with open(part_path, mode) as f:
+                    shutil.copyfileobj(resp.raw, f, length=65536)
+            except BaseException:
+                if encoded and os.path.exists(part_path):
+                    os.remove(part_path)
+                raise
+            
+            meta = {
+                'etag': resp.headers.get('ETag'),
+                'last_modified': resp.headers.get('Last-Modified')
+            }
+        
+        os.replace(part_path, path)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        return True
+    
+    def _write_json_if_changed(self, filepath, data):
+        """
+        Write `data` as indented JSON unless the file on disk already holds
+        the same content, tracked by a SHA256 of the canonical
+        (sorted-key, compact) encoding in a `.sha256` sidecar.
+        Returns True if the file was (re)written.
+        """
+        digest = hashlib.sha256(orjson.dumps(data, option=orjson.OPT_SORT_KEYS)).hexdigest()
+        hash_path = filepath + '.sha256'
+        if os.path.exists(filepath) and os.path.exists(hash_path):
+            with open(hash_path, 'r') as f:
+                if f.read().strip() == digest:
+                    return False
+        
+        # orjson keeps the C fast path even with indentation (stdlib json drops it)
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        with open(hash_path, 'w') as f:
+            f.write(digest)
+        return True
+    
     def fetch_web_attack_payloads(self):
         """
         Web Attack Payload Database
@@ -117,11 +566,11 @@ class SecurityDatasetManager:
         
         filepath = os.path.join(self.base_dir, 'web_attack_payloads.json')
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(attack_database, f, indent=2)
+        written = self._write_json_if_changed(filepath, attack_database)
         
         total_payloads = sum(len(v) for v in attack_database.values())
-        print(f"✅ Created payload database with {total_payloads} attack patterns")
+        action = "Created" if written else "Unchanged"
+        print(f"✅ {action} payload database with {total_payloads} attack patterns")
         print(f"   Categories: {list(attack_database.keys())}")
         
         return filepath
@@ -176,175 +625,143 @@ class SecurityDatasetManager:
         
         filepath = os.path.join(self.base_dir, 'api_abuse_scenarios.json')
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(abuse_scenarios, f, indent=2)
+        written = self._write_json_if_changed(filepath, abuse_scenarios)
         
-        print(f"✅ Created {len(abuse_scenarios)} API abuse scenario categories")
+        action = "Created" if written else "Unchanged"
+        print(f"✅ {action} {len(abuse_scenarios)} API abuse scenario categories")
         return filepath
     
-    def parse_http_request_to_features(self, http_text, is_malicious=False):
-        """Convert raw HTTP request to feature dictionary"""
-        lines = http_text.strip().split('\n')
-        if not lines:
-            return None
-        
-        # Parse request line
-        request_match = re.match(r'(\w+)\s+([^\s]+)\s+HTTP', lines[0])
+    @staticmethod
+    def parse_http_request_to_features(http_text, is_malicious=False):
+        """
+        Convert raw HTTP request to feature dictionary.
+        timestamp is assigned per batch by process_csic_dataset and
+        status_code / response_time_ms are filled in afterwards, in bulk,
+        by simulate_responses().
+        """
+        # Parse request line (only the first line is needed)
+        start = _LEADING_SPACE_RE.match(http_text).end()
+        end = http_text.find('\n', start)
+        first_line = http_text[start:] if end < 0 else http_text[start:end]
+        request_match = _REQUEST_LINE_RE.match(first_line)
         if not request_match:
             return None
         
         method = request_match.group(1)
-        endpoint = request_match.group(2)
+        endpoint_lower = request_match.group(2).lower()
         
         # Detect attack indicators
-        attack_indicators = [
-            r"(\%27)|(\')|(\-\-)|(\%23)|(#)",  # SQL injection
-            r"<script|javascript:|onerror=|onload=",  # XSS
-            r"\.\./|\.\.\\",  # Path traversal
-            r"union.*select|concat\(|char\(",  # SQL union
-            r"exec\(|eval\(|system\(",  # Command injection
-        ]
-        
-        has_attack_pattern = any(re.search(pat, endpoint, re.I) for pat in attack_indicators)
-        
-        # Simulate response based on attack detection
-        if is_malicious or has_attack_pattern:
-            status = np.random.choice([400, 403, 500], p=[0.5, 0.3, 0.2])
-            response_time = np.random.uniform(50, 300)
-        else:
-            status = np.random.choice([200, 304, 404], p=[0.85, 0.1, 0.05])
-            response_time = np.random.uniform(20, 150)
+        has_attack_pattern = _has_attack_indicator_lowered(endpoint_lower)
         
         # Normalize endpoint
-        if 'login' in endpoint.lower():
+        if 'login' in endpoint_lower:
             normalized_endpoint = '/login'
-        elif 'payment' in endpoint.lower() or 'pay' in endpoint.lower():
+        elif 'pay' in endpoint_lower:
             normalized_endpoint = '/payment'
-        elif 'search' in endpoint.lower():
+        elif 'search' in endpoint_lower:
             normalized_endpoint = '/search'
         else:
             normalized_endpoint = '/api/resource'
         
         return {
-            'timestamp': datetime.utcnow(),
             'endpoint': normalized_endpoint,
             'method': method,
-            'status_code': status,
-            'response_time_ms': response_time,
             'payload_size': len(http_text),
             'is_attack': is_malicious or has_attack_pattern
         }
     
-    def aggregate_requests_to_windows(self, request_list, window_size=50):
+    def simulate_responses(self, columns):
+        """Draw simulated status codes / response times for parsed requests in one vectorized pass"""
+        is_attack = columns['is_attack']
+        n = len(is_attack)
+        attack_status = self.rng.choice([400, 403, 500], size=n, p=[0.5, 0.3, 0.2])
+        normal_status = self.rng.choice([200, 304, 404], size=n, p=[0.85, 0.1, 0.05])
+        columns['status_code'] = np.where(is_attack, attack_status, normal_status).astype(np.int16)
+        columns['response_time_ms'] = np.where(
+            is_attack,
+            self.rng.uniform(50, 300, size=n),
+            self.rng.uniform(20, 150, size=n)
+        ).astype(np.float32)
+        return columns
+    
+    def aggregate_requests_to_windows(self, request_list, window_size=50, stride=None):
         """
         Aggregate individual requests into time windows.
         Extracts 8 features per window for ML training.
+        
+        Accepts either a list of request dicts or the parallel arrays
+        produced by requests_to_columns(). With `stride`, windows of
+        `window_size` requests start every `stride` requests (overlapping
+        when stride < window_size) and also carry the response-time
+        TEMPORAL_FEATURE_COLUMNS.
         """
-        if not request_list:
+        columns = request_list if isinstance(request_list, dict) else requests_to_columns(request_list)
+        n = len(columns['endpoint_id'])
+        if n == 0:
             return pd.DataFrame()
+        if stride is not None:
+            return _sliding_window_features(columns, window_size, stride)
         
-        features_list = []
+        out = window_feature_matrix(columns, window_size)
+        # Skip small windows before building the DataFrame
+        out = out[out[:, 0] >= 5]
+        features = pd.DataFrame(out, columns=WINDOW_FEATURE_COLUMNS).astype(WINDOW_FEATURE_DTYPES)
+        features['window_start'] = _window_starts(len(features))
         
-        for i in range(0, len(request_list), window_size):
-            window = request_list[i:i+window_size]
-            
-            if len(window) < 5:  # Skip small windows
-                continue
-            
-            # Feature 1: Request count
-            req_count = len(window)
-            
-            # Feature 2: Error rate
-            status_codes = [r['status_code'] for r in window]
-            errors = sum(1 for s in status_codes if s >= 400)
-            error_rate = errors / req_count
-            
-            # Feature 3 & 4: Response times
-            response_times = [r['response_time_ms'] for r in window]
-            avg_response_time = np.mean(response_times)
-            max_response_time = np.max(response_times)
-            
-            # Feature 5: Payload sizes
-            payloads = [r['payload_size'] for r in window]
-            payload_mean = np.mean(payloads)
-            
-            # Feature 6: Unique endpoints
-            endpoints = [r['endpoint'] for r in window]
-            unique_endpoints = len(set(endpoints))
-            
-            # Feature 7: Repeat rate
-            endpoint_counts = Counter(endpoints)
-            most_common = endpoint_counts.most_common(1)[0][1] if endpoint_counts else 0
-            repeat_rate = most_common / req_count
-            
-            # Feature 8: Status code entropy
-            status_counts = Counter(status_codes)
-            status_probs = [cnt / req_count for cnt in status_counts.values()]
-            status_entropy = -sum(p * math.log2(p) for p in status_probs if p > 0)
-            
-            features_list.append({
-                'req_count': req_count,
-                'error_rate': error_rate,
-                'avg_response_time': avg_response_time,
-                'max_response_time': max_response_time,
-                'payload_mean': payload_mean,
-                'unique_endpoints': unique_endpoints,
-                'repeat_rate': repeat_rate,
-                'status_entropy': status_entropy,
-                'window_start': datetime.utcnow() - timedelta(minutes=len(features_list))
-            })
-        
-        return pd.DataFrame(features_list)
+        return features
     
-    def process_csic_dataset(self, file_paths):
-        """Process CSIC HTTP dataset into ML features"""
+    def _save_features(self, df, name):
+        """
+        Write a feature table to processed/<name>.csv, plus a zstd Parquet
+        copy when pyarrow is installed. Returns the CSV path.
+        """
+        output_path = os.path.join(self.processed_dir, f'{name}.csv')
+        df.to_csv(output_path, index=False)
+        if pyarrow is not None:
+            df.to_parquet(os.path.join(self.processed_dir, f'{name}.parquet'), index=False, compression='zstd')
+        return output_path
+    
+    def process_csic_dataset(self, file_paths, stride=None):
+        """
+        Process CSIC HTTP dataset into ML features. With `stride`, the
+        saved windows overlap and carry the TEMPORAL_FEATURE_COLUMNS too
+        (see aggregate_requests_to_windows).
+        """
         if not file_paths or not file_paths.get('normal') or not file_paths.get('attacks'):
             return None
         
         print("\n📊 Processing CSIC dataset into feature vectors...")
         
-        all_requests = []
+        # Parsed inline: a few thousand requests take tens of milliseconds,
+        # far less than spawning worker processes would
+        normal_requests, normal_error = _parse_csic_file(file_paths['normal'], False, 3000)
+        attack_requests, attack_error = _parse_csic_file(file_paths['attacks'], True, 2000)
         
-        # Process normal traffic
-        try:
-            with open(file_paths['normal'], 'r', encoding='latin-1', errors='ignore') as f:
-                content = f.read()
-                http_requests = content.split('\n\n')
-                
-                for req_text in http_requests[:3000]:
-                    if req_text.strip():
-                        parsed = self.parse_http_request_to_features(req_text, is_malicious=False)
-                        if parsed:
-                            all_requests.append(parsed)
-            
-            print(f"✅ Extracted {len(all_requests)} normal request features")
-        except Exception as e:
-            print(f"❌ Error processing normal traffic: {e}")
+        if normal_error:
+            print(f"❌ Error processing normal traffic: {normal_error}")
+        else:
+            print(f"✅ Extracted {len(normal_requests)} normal request features")
+        if attack_error:
+            print(f"❌ Error processing attacks: {attack_error}")
+        else:
+            print(f"✅ Extracted {len(attack_requests)} attack request features")
         
-        # Process attack traffic
-        attack_count = 0
-        try:
-            with open(file_paths['attacks'], 'r', encoding='latin-1', errors='ignore') as f:
-                content = f.read()
-                http_requests = content.split('\n\n')
-                
-                for req_text in http_requests[:2000]:
-                    if req_text.strip():
-                        parsed = self.parse_http_request_to_features(req_text, is_malicious=True)
-                        if parsed:
-                            all_requests.append(parsed)
-                            attack_count += 1
-            
-            print(f"✅ Extracted {attack_count} attack request features")
-        except Exception as e:
-            print(f"❌ Error processing attacks: {e}")
+        all_requests = normal_requests + attack_requests
+        
+        # Convert to parallel arrays once; everything downstream works on columns
+        columns = requests_to_columns(all_requests)
+        
+        # One clock read for the whole batch; requests are spaced 1ms apart
+        columns['timestamp'] = np.datetime64(datetime.utcnow(), 'ms') + np.arange(len(all_requests))
+        
+        # Simulate responses based on attack detection
+        self.simulate_responses(columns)
         
         # Create feature windows
-        features_df = self.aggregate_requests_to_windows(all_requests, window_size=25)
+        features_df = self.aggregate_requests_to_windows(columns, window_size=25, stride=stride)
         
         # Save processed features
-        output_path = os.path.join(self.processed_dir, 'csic_features.csv')
-        features_df.to_csv(output_path, index=False)
+        output_path = self._save_features(features_df, 'csic_features')
         print(f"💾 Saved {len(features_df)} feature vectors to {output_path}")
         
         return features_df
@@ -356,50 +773,16 @@ class SecurityDatasetManager:
         """
         print("\n📊 Generating synthetic API traffic patterns...")
         
-        traffic_data = []
-        
-        # Normal users (60%)
-        for _ in range(int(num_samples * 0.6)):
-            traffic_data.append({
-                'req_count': np.random.randint(5, 50),
-                'error_rate': np.random.uniform(0.0, 0.1),
-                'avg_response_time': np.random.uniform(50, 200),
-                'max_response_time': np.random.uniform(150, 400),
-                'payload_mean': np.random.uniform(100, 500),
-                'unique_endpoints': np.random.randint(2, 6),
-                'repeat_rate': np.random.uniform(0.2, 0.6),
-                'status_entropy': np.random.uniform(0.5, 1.2)
-            })
-        
-        # Power users (25%)
-        for _ in range(int(num_samples * 0.25)):
-            traffic_data.append({
-                'req_count': np.random.randint(100, 300),
-                'error_rate': np.random.uniform(0.05, 0.25),
-                'avg_response_time': np.random.uniform(150, 400),
-                'max_response_time': np.random.uniform(300, 800),
-                'payload_mean': np.random.uniform(200, 800),
-                'unique_endpoints': np.random.randint(3, 5),
-                'repeat_rate': np.random.uniform(0.4, 0.7),
-                'status_entropy': np.random.uniform(0.4, 0.9)
-            })
-        
-        # Attackers / Bots (15%)
-        for _ in range(int(num_samples * 0.15)):
-            traffic_data.append({
-                'req_count': np.random.randint(400, 1500),
-                'error_rate': np.random.uniform(0.4, 0.95),
-                'avg_response_time': np.random.uniform(300, 1500),
-                'max_response_time': np.random.uniform(800, 3000),
-                'payload_mean': np.random.uniform(500, 2000),
-                'unique_endpoints': 1,
-                'repeat_rate': np.random.uniform(0.85, 1.0),
-                'status_entropy': np.random.uniform(0.1, 0.5)
-            })
-        
-        df = pd.DataFrame(traffic_data)
-        output_path = os.path.join(self.processed_dir, 'synthetic_api_traffic.csv')
-        df.to_csv(output_path, index=False)
+        # One (n_class, 8) uniform draw per class; integer features are floored
+        blocks = [
+            self.rng.uniform(lows, highs, size=(int(num_samples * share), len(WINDOW_FEATURE_COLUMNS)))
+            for share, lows, highs in _SYNTHETIC_USER_CLASSES
+        ]
+        arr = np.vstack(blocks)
+        arr[:, _INTEGER_FEATURES] = np.floor(arr[:, _INTEGER_FEATURES])
+        
+        df = pd.DataFrame(arr, columns=WINDOW_FEATURE_COLUMNS).astype(WINDOW_FEATURE_DTYPES)
+        self._save_features(df, 'synthetic_api_traffic')
         
         print(f"✅ Generated {len(df)} synthetic samples")
         return df
@@ -449,12 +832,12 @@ class SecurityDatasetManager:
         if all_features:
             combined_df = pd.concat(all_features, ignore_index=True)
             
-            # Remove any duplicates
-            combined_df = combined_df.drop_duplicates()
+            # Remove any duplicates (one int64 hash per row instead of tuple hashing)
+            row_hashes = pd.util.hash_pandas_object(combined_df, index=False)
+            combined_df = combined_df[~row_hashes.duplicated().to_numpy()].reset_index(drop=True)
             
             # Save combined dataset
-            output_path = os.path.join(self.processed_dir, 'combined_training_data.csv')
-            combined_df.to_csv(output_path, index=False)
+            output_path = self._save_features(combined_df, 'combined_training_data')
             
             print("\n" + "="*70)
             print("DATASET PROCESSING COMPLETE")
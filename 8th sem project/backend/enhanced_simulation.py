@@ -3,14 +3,20 @@ Enhanced Async Simulation Engine
 Generates >150 req/sec with proper anomaly injection for all endpoints
 """
 import asyncio
-import random
+import csv
+import io
 import time
-from datetime import datetime
-from typing import List, Dict
+import numpy as np
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import compress
+from typing import List, Dict, Tuple
 from enum import Enum
 from database import SessionLocal, APILog, AnomalyLog
 from anomaly_detection import anomaly_detector
 from resolution_engine import resolution_engine
+from queued_logging import get_queued_logger
 
 class AnomalyType(Enum):
     LATENCY_SPIKE = "latency_spike"
@@ -25,6 +31,104 @@ class Severity(Enum):
     MEDIUM = "MEDIUM"
     LOW = "LOW"
 
+# Simulation logging goes through the shared queue so the event loop never
+# blocks on console writes; a background listener thread does the actual I/O.
+logger = get_queued_logger(__name__)
+
+# Per-batch status line is only logged every N batches
+LOG_EVERY_N_BATCHES = 10
+
+# Enum .value strings resolved once instead of per request
+_ANOMALY_VALUE = {t: t.value for t in AnomalyType}
+_SEVERITY_VALUE = {s: s.value for s in Severity}
+
+# Status code samplers as (codes, cumulative weights); the weights are static,
+# so the CDFs are built once instead of on every draw
+_NORMAL_STATUS_CDF = ((200, 400, 404), (95, 98, 100))
+_ANOMALY_STATUS_CDFS = {
+    AnomalyType.LATENCY_SPIKE: ((200, 500, 503), (60, 90, 100)),
+    AnomalyType.ERROR_SPIKE: ((500, 503, 502, 504, 200), (40, 70, 90, 100, 110)),
+    AnomalyType.TIMEOUT: ((504, 408, 503), (60, 90, 100)),
+    AnomalyType.TRAFFIC_BURST: ((429, 503, 200), (40, 70, 100)),
+    AnomalyType.RESOURCE_EXHAUSTION: ((503, 507, 500, 200), (40, 70, 90, 100)),
+}
+
+
+def _draw_statuses(rng, status_cdf, n: int) -> List[int]:
+    """n weighted draws from a precomputed (codes, cumulative weights) pair"""
+    codes, cdf = status_cdf
+    status_idx = np.searchsorted(cdf, rng.random(n) * cdf[-1], side='right')
+    return np.asarray(codes)[status_idx].tolist()
+
+
+def _draw_clients(rng, n: int) -> Tuple[List[str], List[str]]:
+    """n random client IPs (192.168.x.y) and user ids from two array draws"""
+    octets = rng.integers(1, 256, size=(n, 2)).tolist()
+    user_ids = rng.integers(1000, 10000, size=n).tolist()
+    return [f"192.168.{a}.{b}" for a, b in octets], [f"user_{u}" for u in user_ids]
+
+
+@dataclass(frozen=True)
+class AnomalyProfile:
+    """Generation parameters for one (anomaly type, severity) pair"""
+    response_time: Tuple[float, float]
+    status_cdf: Tuple[tuple, tuple]
+    error_rate: float
+    impact_score: float
+    payload_size: Tuple[int, int] = (500, 2000)  # inclusive
+
+
+_HIGH_SEVERITIES = (Severity.CRITICAL, Severity.HIGH)
+
+
+def _build_anomaly_profiles() -> Dict:
+    """Resolve the per-type / per-severity parameters into one profile per pair"""
+    latency_ranges = {
+        Severity.CRITICAL: (5000, 8000),
+        Severity.HIGH: (3000, 5000),
+        Severity.MEDIUM: (1500, 3000),
+        Severity.LOW: (800, 1500)
+    }
+    error_rates = {
+        Severity.CRITICAL: 0.85,
+        Severity.HIGH: 0.65,
+        Severity.MEDIUM: 0.45,
+        Severity.LOW: 0.25
+    }
+    profiles = {}
+    for severity in Severity:
+        high = severity in _HIGH_SEVERITIES
+        profiles[AnomalyType.LATENCY_SPIKE, severity] = AnomalyProfile(
+            latency_ranges[severity], _ANOMALY_STATUS_CDFS[AnomalyType.LATENCY_SPIKE],
+            0.15, 0.7 if high else 0.4)
+        profiles[AnomalyType.ERROR_SPIKE, severity] = AnomalyProfile(
+            (200, 800), _ANOMALY_STATUS_CDFS[AnomalyType.ERROR_SPIKE],
+            error_rates[severity], 0.85 if high else 0.5)
+        profiles[AnomalyType.TIMEOUT, severity] = AnomalyProfile(
+            (8000, 15000), _ANOMALY_STATUS_CDFS[AnomalyType.TIMEOUT], 0.9, 0.95)
+        profiles[AnomalyType.TRAFFIC_BURST, severity] = AnomalyProfile(
+            (500, 1500), _ANOMALY_STATUS_CDFS[AnomalyType.TRAFFIC_BURST], 0.3, 0.6)
+        profiles[AnomalyType.RESOURCE_EXHAUSTION, severity] = AnomalyProfile(
+            (3000, 7000), _ANOMALY_STATUS_CDFS[AnomalyType.RESOURCE_EXHAUSTION], 0.7, 0.9,
+            payload_size=(500, 8000))
+    return profiles
+
+
+_ANOMALY_PROFILES = _build_anomaly_profiles()
+_DEFAULT_PROFILE = AnomalyProfile((50, 250), ((200,), (1,)), 0.02, 0.1)
+
+# Simulated endpoints that receive POST requests (everything else is GET)
+_POST_ENDPOINTS = frozenset({'/sim/payment', '/sim/login', '/sim/signup'})
+
+# PostgreSQL (psycopg2): batches at least this large are written with COPY instead of INSERT
+COPY_THRESHOLD = 100
+
+_COPY_COLUMNS = (
+    'timestamp', 'endpoint', 'method', 'response_time_ms', 'status_code',
+    'payload_size', 'ip_address', 'user_id', 'is_simulation'
+)
+
+
 class EnhancedSimulationEngine:
     """High-performance async simulation engine"""
     
@@ -38,6 +142,9 @@ class EnhancedSimulationEngine:
         '/sim/logout': (AnomalyType.LATENCY_SPIKE, Severity.LOW)
     }
     
+    # Spread request timestamps across each 1-second batch instead of stamping them all alike
+    JITTER_TIMESTAMPS = True
+    
     def __init__(self):
         self.active = False
         self.total_requests = 0
@@ -47,174 +154,206 @@ class EnhancedSimulationEngine:
             'anomalies_injected': 0,
             'anomalies_detected': 0,
             'windows_processed': 0,
-            'by_endpoint': {}
+            'by_endpoint': defaultdict(lambda: {'total': 0, 'anomalies': 0})
         }
         self.websocket_manager = None
+        self._rng = np.random.default_rng()
+        self._endpoint_items = tuple(self.ENDPOINT_ANOMALIES.items())
+        self._db = None  # long-lived session while run() is active
         
+    def _session(self):
+        """(session, owned): run()'s long-lived session, or a fresh one the caller must close"""
+        if self._db is not None:
+            return self._db, False
+        return SessionLocal(), True
+    
     def set_websocket_manager(self, manager):
         """Set websocket manager for real-time updates"""
         self.websocket_manager = manager
         
-    def generate_anomalous_request(self, endpoint: str, anomaly_type: AnomalyType, severity: Severity) -> Dict:
+    def generate_anomalous_request(self, endpoint: str, anomaly_type: AnomalyType, severity: Severity,
+                                   base_time: datetime = None) -> Dict:
         """Generate request with specific anomaly"""
-        base_time = datetime.utcnow()
-        
-        # Anomaly-specific parameters
-        if anomaly_type == AnomalyType.LATENCY_SPIKE:
-            severity_multipliers = {
-                Severity.CRITICAL: (5000, 8000),
-                Severity.HIGH: (3000, 5000),
-                Severity.MEDIUM: (1500, 3000),
-                Severity.LOW: (800, 1500)
-            }
-            response_min, response_max = severity_multipliers[severity]
-            response_time = random.uniform(response_min, response_max)
-            status_code = random.choices([200, 500, 503], weights=[60, 30, 10])[0]
-            error_rate = 0.15
-            impact_score = 0.7 if severity in [Severity.CRITICAL, Severity.HIGH] else 0.4
-            
-        elif anomaly_type == AnomalyType.ERROR_SPIKE:
-            severity_error_rates = {
-                Severity.CRITICAL: 0.85,
-                Severity.HIGH: 0.65,
-                Severity.MEDIUM: 0.45,
-                Severity.LOW: 0.25
-            }
-            error_rate = severity_error_rates[severity]
-            response_time = random.uniform(200, 800)
-            status_code = random.choices([500, 503, 502, 504, 200], weights=[40, 30, 20, 10, 10])[0]
-            impact_score = 0.85 if severity in [Severity.CRITICAL, Severity.HIGH] else 0.5
-            
-        elif anomaly_type == AnomalyType.TIMEOUT:
-            response_time = random.uniform(8000, 15000)
-            status_code = random.choices([504, 408, 503], weights=[60, 30, 10])[0]
-            error_rate = 0.9
-            impact_score = 0.95
-            
-        elif anomaly_type == AnomalyType.TRAFFIC_BURST:
-            response_time = random.uniform(500, 1500)
-            status_code = random.choices([429, 503, 200], weights=[40, 30, 30])[0]
-            error_rate = 0.3
-            impact_score = 0.6
-            
-        elif anomaly_type == AnomalyType.RESOURCE_EXHAUSTION:
-            response_time = random.uniform(3000, 7000)
-            status_code = random.choices([503, 507, 500, 200], weights=[40, 30, 20, 10])[0]
-            error_rate = 0.7
-            impact_score = 0.9
-            
-        else:
-            response_time = random.uniform(50, 250)
-            status_code = 200
-            error_rate = 0.02
-            impact_score = 0.1
-            
-        payload_size = random.randint(500, 8000) if anomaly_type == AnomalyType.RESOURCE_EXHAUSTION else random.randint(500, 2000)
+        if base_time is None:
+            base_time = datetime.utcnow()
+        return self._generate_anomalous_requests(endpoint, anomaly_type, severity, [base_time])[0]
+    
+    def generate_normal_request(self, endpoint: str, base_time: datetime = None) -> Dict:
+        """Generate normal request"""
+        if base_time is None:
+            base_time = datetime.utcnow()
+        return self._generate_normal_requests(endpoint, [base_time])[0]
+    
+    def _generate_normal_requests(self, endpoint: str, timestamps: List[datetime]) -> List[Dict]:
+        """Vectorized generate_normal_request(): one request per timestamp, drawn in one pass per field"""
+        rng = self._rng
+        n = len(timestamps)
+        method = 'POST' if endpoint in _POST_ENDPOINTS else 'GET'
+        response_times = rng.uniform(50, 250, size=n).tolist()
+        status_codes = _draw_statuses(rng, _NORMAL_STATUS_CDF, n)
+        payload_sizes = rng.integers(500, 2001, size=n).tolist()
+        ip_addresses, user_ids = _draw_clients(rng, n)
         
-        return {
-            'timestamp': base_time,
+        return [{
+            'timestamp': timestamp,
             'endpoint': endpoint,
-            'method': 'POST' if endpoint in ['/sim/payment', '/sim/login', '/sim/signup'] else 'GET',
+            'method': method,
             'response_time_ms': response_time,
             'status_code': status_code,
             'payload_size': payload_size,
-            'ip_address': f"192.168.{random.randint(1, 255)}.{random.randint(1, 255)}",
-            'user_id': f"user_{random.randint(1000, 9999)}",
+            'ip_address': ip_address,
+            'user_id': user_id,
             'is_simulation': True,
-            '_anomaly_metadata': {
-                'type': anomaly_type.value,
-                'severity': severity.value,
-                'error_rate': error_rate,
-                'impact_score': impact_score,
-                'duration_seconds': random.uniform(15, 60)
-            }
-        }
+            '_anomaly_metadata': None
+        } for timestamp, response_time, status_code, payload_size, ip_address, user_id
+          in zip(timestamps, response_times, status_codes, payload_sizes, ip_addresses, user_ids)]
     
-    def generate_normal_request(self, endpoint: str) -> Dict:
-        """Generate normal request"""
-        return {
-            'timestamp': datetime.utcnow(),
+    def _generate_anomalous_requests(self, endpoint: str, anomaly_type: AnomalyType,
+                                     severity: Severity, timestamps: List[datetime]) -> List[Dict]:
+        """Vectorized generate_anomalous_request(): one request per timestamp, drawn from one profile"""
+        rng = self._rng
+        profile = _ANOMALY_PROFILES.get((anomaly_type, severity), _DEFAULT_PROFILE)
+        n = len(timestamps)
+        method = 'POST' if endpoint in _POST_ENDPOINTS else 'GET'
+        
+        status_codes = _draw_statuses(rng, profile.status_cdf, n)
+        response_times = rng.uniform(*profile.response_time, size=n).tolist()
+        payload_lo, payload_hi = profile.payload_size
+        payload_sizes = rng.integers(payload_lo, payload_hi + 1, size=n).tolist()
+        durations = rng.uniform(15, 60, size=n).tolist()
+        ip_addresses, user_ids = _draw_clients(rng, n)
+        
+        # Shared metadata skeleton; only duration varies per request
+        metadata = {
+            'type': _ANOMALY_VALUE[anomaly_type],
+            'severity': _SEVERITY_VALUE[severity],
+            'error_rate': profile.error_rate,
+            'impact_score': profile.impact_score
+        }
+        
+        return [{
+            'timestamp': timestamp,
             'endpoint': endpoint,
-            'method': 'POST' if endpoint in ['/sim/payment', '/sim/login', '/sim/signup'] else 'GET',
-            'response_time_ms': random.uniform(50, 250),
-            'status_code': random.choices([200, 400, 404], weights=[95, 3, 2])[0],
-            'payload_size': random.randint(500, 2000),
-            'ip_address': f"192.168.{random.randint(1, 255)}.{random.randint(1, 255)}",
-            'user_id': f"user_{random.randint(1000, 9999)}",
+            'method': method,
+            'response_time_ms': response_time,
+            'status_code': status_code,
+            'payload_size': payload_size,
+            'ip_address': ip_address,
+            'user_id': user_id,
             'is_simulation': True,
-            '_anomaly_metadata': None
-        }
+            '_anomaly_metadata': {**metadata, 'duration_seconds': duration}
+        } for timestamp, response_time, status_code, payload_size, duration, ip_address, user_id
+          in zip(timestamps, response_times, status_codes, payload_sizes, durations, ip_addresses, user_ids)]
     
     async def generate_request_batch(self, target_rps: int = 200) -> List[Dict]:
         """Generate batch of requests distributed across all endpoints"""
         requests = []
-        endpoints = list(self.ENDPOINT_ANOMALIES.keys())
         
         # Distribute requests across endpoints
-        reqs_per_endpoint = target_rps // len(endpoints)
+        reqs_per_endpoint = target_rps // len(self._endpoint_items)
+        by_endpoint = self.stats['by_endpoint']
+        
+        # One clock read per batch; each endpoint's requests are spread evenly over
+        # the second leading up to it (never in the future, which windowed queries skip)
+        batch_ts = datetime.utcnow()
+        if self.JITTER_TIMESTAMPS and reqs_per_endpoint:
+            timestamps = [batch_ts - timedelta(milliseconds=(reqs_per_endpoint - 1 - i) * 1000 // reqs_per_endpoint)
+                          for i in range(reqs_per_endpoint)]
+        else:
+            timestamps = [batch_ts] * reqs_per_endpoint
         
-        for endpoint in endpoints:
-            anomaly_type, severity = self.ENDPOINT_ANOMALIES[endpoint]
+        for endpoint, (anomaly_type, severity) in self._endpoint_items:
+            # 30% chance of anomaly injection for continuous anomaly traffic
+            is_anomalous = (self._rng.random(reqs_per_endpoint) < 0.3).tolist()
+            is_normal = [not anomalous for anomalous in is_anomalous]
+            anomalous_requests = self._generate_anomalous_requests(
+                endpoint, anomaly_type, severity, list(compress(timestamps, is_anomalous)))
+            normal_requests = self._generate_normal_requests(endpoint, list(compress(timestamps, is_normal)))
+            n_anomalous = len(anomalous_requests)
             
-            for _ in range(reqs_per_endpoint):
-                # 30% chance of anomaly injection for continuous anomaly traffic
-                if random.random() < 0.3:
-                    request = self.generate_anomalous_request(endpoint, anomaly_type, severity)
-                    self.stats['anomalies_injected'] += 1
-                else:
-                    request = self.generate_normal_request(endpoint)
-                    
-                requests.append(request)
-                
-                # Track endpoint stats
-                if endpoint not in self.stats['by_endpoint']:
-                    self.stats['by_endpoint'][endpoint] = {'total': 0, 'anomalies': 0}
-                self.stats['by_endpoint'][endpoint]['total'] += 1
-                if request['_anomaly_metadata']:
-                    self.stats['by_endpoint'][endpoint]['anomalies'] += 1
+            anomalous_iter, normal_iter = iter(anomalous_requests), iter(normal_requests)
+            requests.extend(next(anomalous_iter) if anomalous else next(normal_iter)
+                            for anomalous in is_anomalous)
+            
+            # Track endpoint stats once per endpoint instead of per request
+            self.stats['anomalies_injected'] += n_anomalous
+            endpoint_stats = by_endpoint[endpoint]
+            endpoint_stats['total'] += reqs_per_endpoint
+            endpoint_stats['anomalies'] += n_anomalous
         
         return requests
     
-    async def persist_requests(self, requests: List[Dict]):
-        """Persist requests to database asynchronously"""
-        db = SessionLocal()
+    def _bulk_copy(self, db, rows: List[Dict]):
+        """Stream rows into api_logs with PostgreSQL COPY on the session's connection"""
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerows([row[col] for col in _COPY_COLUMNS] for row in rows)
+        buf.seek(0)
+        
+        cursor = db.connection().connection.cursor()
         try:
-            for req in requests:
-                log_entry = APILog(
-                    timestamp=req['timestamp'],
-                    endpoint=req['endpoint'],
-                    method=req['method'],
-                    response_time_ms=req['response_time_ms'],
-                    status_code=req['status_code'],
-                    payload_size=req['payload_size'],
-                    ip_address=req['ip_address'],
-                    user_id=req['user_id'],
-                    is_simulation=True
-                )
-                db.add(log_entry)
+            cursor.copy_expert(
+                f"COPY {APILog.__tablename__} ({', '.join(_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buf
+            )
+        finally:
+            cursor.close()
+    
+    def _write_requests(self, requests: List[Dict]) -> bool:
+        """Blocking write of one batch (runs in a worker thread); True on success"""
+        db, owned = self._session()
+        try:
+            # One Core executemany INSERT; skips ORM object construction and unit-of-work bookkeeping
+            rows = [{
+                'timestamp': req['timestamp'],
+                'endpoint': req['endpoint'],
+                'method': req['method'],
+                'response_time_ms': req['response_time_ms'],
+                'status_code': req['status_code'],
+                'payload_size': req['payload_size'],
+                'ip_address': req['ip_address'],
+                'user_id': req['user_id'],
+                'is_simulation': True
+            } for req in requests]
+            if len(rows) >= COPY_THRESHOLD and db.get_bind().dialect.driver == 'psycopg2':
+                self._bulk_copy(db, rows)
+            elif rows:
+                db.execute(APILog.__table__.insert(), rows)
             
             db.commit()
-            self.total_requests += len(requests)
-            self.stats['total_requests'] = self.total_requests
+            return True
         except Exception as e:
-            print(f"❌ Error persisting requests: {e}")
+            logger.error("[ERROR] Persisting requests failed: %s", e)
             db.rollback()
+            return False
         finally:
-            db.close()
+            if owned:
+                db.close()
+    
+    async def persist_requests(self, requests: List[Dict]):
+        """Persist requests to database without blocking the event loop"""
+        if await asyncio.to_thread(self._write_requests, requests):
+            self.total_requests += len(requests)
+            self.stats['total_requests'] = self.total_requests
     
     async def detect_and_broadcast_anomalies(self):
         """Run detection and broadcast anomalies via websocket"""
-        from feature_engineering import extract_features_from_logs
+        from feature_engineering import extract_features_all_endpoints
         
-        db = SessionLocal()
+        db, owned = self._session()
+        pending = []  # (anomaly_log, detection_result, resolutions) awaiting one commit
+        detected = []
         try:
+            # One grouped query for every endpoint's window features
+            features_by_endpoint = extract_features_all_endpoints(
+                time_window_minutes=1,
+                is_simulation=True,
+                db=db
+            )
+            
             # Detect anomalies for each endpoint separately
-            for endpoint in self.ENDPOINT_ANOMALIES.keys():
-                features = extract_features_from_logs(
-                    time_window_minutes=1, 
-                    is_simulation=True,
-                    specific_endpoint=endpoint
-                )
+            for endpoint, (assigned_type, assigned_severity) in self._endpoint_items:
+                features = features_by_endpoint.get(endpoint)
                 
                 if not features:
                     continue
@@ -229,10 +368,9 @@ class EnhancedSimulationEngine:
                 
                 self.stats['anomalies_detected'] += 1
                 
-                # Get assigned anomaly type
-                assigned_type, assigned_severity = self.ENDPOINT_ANOMALIES[endpoint]
-                anomaly_type = detection_result.get('anomaly_type', assigned_type.value)
-                severity = detection_result.get('severity', assigned_severity.value)
+                # Fall back to the endpoint's assigned anomaly type
+                anomaly_type = detection_result.get('anomaly_type', _ANOMALY_VALUE[assigned_type])
+                severity = detection_result.get('severity', _SEVERITY_VALUE[assigned_severity])
                 
                 # Generate resolutions
                 resolutions = resolution_engine.generate_resolutions(anomaly_type, severity)
@@ -261,64 +399,73 @@ class EnhancedSimulationEngine:
                     impact_score=detection_result['impact_score'],
                     is_simulation=True
                 )
-                db.add(anomaly_log)
-                db.commit()
-                db.refresh(anomaly_log)
+                pending.append((anomaly_log, detection_result, resolutions))
                 
-                # Broadcast via websocket
-                if self.websocket_manager:
-                    await self.websocket_manager.broadcast({
-                        'type': 'anomaly',
-                        'data': {
-                            'id': anomaly_log.id,
-                            'timestamp': anomaly_log.timestamp.isoformat(),
-                            'endpoint': anomaly_log.endpoint,
-                            'method': anomaly_log.method,
-                            'anomaly_type': anomaly_type,
-                            'severity': severity,
-                            'duration_seconds': 60.0,
-                            'impact_score': detection_result['impact_score'],
-                            'failure_probability': detection_result['failure_probability'],
-                            'risk_score': anomaly_log.risk_score,
-                            'priority': anomaly_log.priority,
-                            'resolutions': resolutions[:5],
-                            'is_anomaly': True
-                        }
-                    })
+                logger.info("[ANOMALY] %s | Type: %s | Severity: %s | Impact: %.2f",
+                            endpoint, anomaly_type, severity, detection_result['impact_score'])
+            
+            # Persist every anomaly from this pass in one transaction
+            if pending:
+                db.add_all([anomaly_log for anomaly_log, _, _ in pending])
+                db.flush()  # assigns ids and the timestamp default without a refresh round-trip
                 
-                print(f"🚨 Anomaly Detected: {endpoint} | Type: {anomaly_type} | Severity: {severity} | Impact: {detection_result['impact_score']:.2f}")
+                # Queued for a single broadcast once the commit succeeds
+                payloads = [{
+                    'id': anomaly_log.id,
+                    'timestamp': anomaly_log.timestamp.isoformat(),
+                    'endpoint': anomaly_log.endpoint,
+                    'method': anomaly_log.method,
+                    'anomaly_type': anomaly_log.anomaly_type,
+                    'severity': anomaly_log.severity,
+                    'duration_seconds': 60.0,
+                    'impact_score': detection_result['impact_score'],
+                    'failure_probability': detection_result['failure_probability'],
+                    'risk_score': anomaly_log.risk_score,
+                    'priority': anomaly_log.priority,
+                    'resolutions': resolutions[:5],
+                    'is_anomaly': True
+                } for anomaly_log, detection_result, resolutions in pending]
+                db.commit()
+                detected = payloads
                 
         except Exception as e:
-            print(f"❌ Error in detection: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[ERROR] Detection failed: %s", e)
+            db.rollback()
         finally:
-            db.close()
+            if owned:
+                db.close()
+        
+        # One coalesced message per detection pass instead of one await per anomaly
+        if detected and self.websocket_manager:
+            await self.websocket_manager.broadcast({
+                'type': 'anomaly_batch',
+                'anomalies': detected
+            })
     
     async def run(self, duration_seconds: int = 60, target_rps: int = 200):
         """Run high-speed simulation with continuous anomaly injection"""
         self.active = True
         self.start_time = time.time()
+        # One session for the whole run: committed per batch, closed when the run ends
+        self._db = SessionLocal()
         self.total_requests = 0
         self.stats = {
             'total_requests': 0,
             'anomalies_injected': 0,
             'anomalies_detected': 0,
             'windows_processed': 0,
-            'by_endpoint': {}
+            'by_endpoint': defaultdict(lambda: {'total': 0, 'anomalies': 0})
         }
         
-        print(f"\n{'='*80}")
-        print(f"🚀 ENHANCED SIMULATION STARTED")
-        print(f"{'='*80}")
-        print(f"   Target RPS: {target_rps}")
-        print(f"   Duration: {duration_seconds}s")
-        print(f"   Endpoints: {len(self.ENDPOINT_ANOMALIES)}")
-        print(f"{'='*80}\n")
+        logger.info("\n%s\nENHANCED SIMULATION STARTED\n%s\n"
+                    "   Target RPS: %s\n   Duration: %ss\n   Endpoints: %d\n%s\n",
+                    '=' * 80, '=' * 80, target_rps, duration_seconds,
+                    len(self.ENDPOINT_ANOMALIES), '=' * 80)
         
         end_time = time.time() + duration_seconds
         detection_interval = 10  # Run detection every 10 seconds
         last_detection = time.time()
+        batch_count = 0
         
         try:
             while self.active and time.time() < end_time:
@@ -333,12 +480,14 @@ class EnhancedSimulationEngine:
                     await self.detect_and_broadcast_anomalies()
                     last_detection = time.time()
                 
-                # Calculate metrics
-                elapsed = time.time() - self.start_time
-                current_rps = self.total_requests / elapsed if elapsed > 0 else 0
-                
-                print(f"⚡ Batch: {len(requests)} reqs | Total: {self.total_requests} | "
-                      f"RPS: {current_rps:.1f} | Anomalies: {self.stats['anomalies_detected']}")
+                # Calculate metrics (status line throttled to every N batches)
+                batch_count += 1
+                if batch_count % LOG_EVERY_N_BATCHES == 0:
+                    elapsed = time.time() - self.start_time
+                    current_rps = self.total_requests / elapsed if elapsed > 0 else 0
+                    logger.info("[BATCH] %d reqs | Total: %d | RPS: %.1f | Anomalies: %d",
+                                len(requests), self.total_requests, current_rps,
+                                self.stats['anomalies_detected'])
                 
                 # Sleep to maintain target rate (1 second per batch)
                 batch_time = time.time() - batch_start
@@ -347,32 +496,34 @@ class EnhancedSimulationEngine:
                     await asyncio.sleep(sleep_time)
                     
         except Exception as e:
-            print(f"❌ Simulation error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[ERROR] Simulation failed: %s", e)
         finally:
             # Final detection pass
             await self.detect_and_broadcast_anomalies()
             
+            self._db.close()
+            self._db = None
             self.active = False
             elapsed_total = time.time() - self.start_time
             final_rps = self.total_requests / elapsed_total if elapsed_total > 0 else 0
             
-            print(f"\n{'='*80}")
-            print(f"✅ SIMULATION COMPLETED")
-            print(f"{'='*80}")
-            print(f"   Total Requests: {self.total_requests}")
-            print(f"   Duration: {elapsed_total:.2f}s")
-            print(f"   Avg RPS: {final_rps:.1f}")
-            print(f"   Anomalies Injected: {self.stats['anomalies_injected']}")
-            print(f"   Anomalies Detected: {self.stats['anomalies_detected']}")
-            print(f"   Detection Rate: {(self.stats['anomalies_detected'] / self.stats['anomalies_injected'] * 100) if self.stats['anomalies_injected'] > 0 else 0:.1f}%")
-            print(f"{'='*80}\n")
+            detection_rate = (self.stats['anomalies_detected'] / self.stats['anomalies_injected'] * 100) if self.stats['anomalies_injected'] > 0 else 0
             
-            # Print per-endpoint stats
-            print("Per-Endpoint Statistics:")
+            # Summary and per-endpoint stats as one record
+            lines = [
+                '', '=' * 80, 'SIMULATION COMPLETED', '=' * 80,
+                f"   Total Requests: {self.total_requests}",
+                f"   Duration: {elapsed_total:.2f}s",
+                f"   Avg RPS: {final_rps:.1f}",
+                f"   Anomalies Injected: {self.stats['anomalies_injected']}",
+                f"   Anomalies Detected: {self.stats['anomalies_detected']}",
+                f"   Detection Rate: {detection_rate:.1f}%",
+                '=' * 80, '',
+                'Per-Endpoint Statistics:'
+            ]
             for endpoint, stats in self.stats['by_endpoint'].items():
-                print(f"  {endpoint}: {stats['total']} reqs, {stats['anomalies']} anomalies")
+                lines.append(f"  {endpoint}: {stats['total']} reqs, {stats['anomalies']} anomalies")
+            logger.info('\n'.join(lines))
     
     def stop(self):
         """Stop simulation"""
@@ -1,8 +1,158 @@
 import pandas as pd
 import numpy as np
+from collections import Counter
 from datetime import datetime, timedelta
+from sqlalchemy import func, select
 from database import SessionLocal, APILog
-from scipy.stats import entropy
+
+
+# Synthetic training cohorts (normal 70%, heavy 20%, bots): feature -> [low, high) range
+_SYNTHETIC_TRAINING_COHORTS = (
+    # Normal traffic
+    {'req_count': (5, 30), 'error_rate': (0.0, 0.15), 'avg_response_time': (50, 300),
+     'max_response_time': (100, 500), 'payload_mean': (100, 2000), 'unique_endpoints': (2, 6),
+     'repeat_rate': (0.1, 0.5), 'status_entropy': (0.3, 1.2)},
+    # Heavy traffic
+    {'req_count': (30, 80), 'error_rate': (0.15, 0.35), 'avg_response_time': (300, 700),
+     'max_response_time': (500, 1200), 'payload_mean': (1500, 5000), 'unique_endpoints': (3, 8),
+     'repeat_rate': (0.4, 0.7), 'status_entropy': (1.0, 2.0)},
+    # Bots
+    {'req_count': (80, 200), 'error_rate': (0.30, 0.70), 'avg_response_time': (700, 1500),
+     'max_response_time': (1200, 3000), 'payload_mean': (50, 500), 'unique_endpoints': (1, 3),
+     'repeat_rate': (0.7, 0.95), 'status_entropy': (0.1, 0.8)},
+)
+_SYNTHETIC_INTEGER_FEATURES = frozenset(['req_count', 'unique_endpoints'])
+_SYNTHETIC_ENDPOINTS = ['/login', '/search', '/payment', '/health']
+
+
+def _shannon_entropy(counts):
+    """Shannon entropy (nats) of a small array of category counts"""
+    counts = np.asarray(counts, dtype=float)
+    counts = counts[counts > 0]
+    if counts.size == 0:
+        return 0.0
+    p = counts / counts.sum()
+    return float(-np.sum(p * np.log(p))) + 0.0  # + 0.0 turns -0.0 into 0.0
+
+
+def _shannon_entropy_rows(counts):
+    """Row-wise _shannon_entropy() of a (rows, categories) count matrix in one pass"""
+    counts = np.asarray(counts, dtype=float)
+    totals = counts.sum(axis=1, keepdims=True)
+    p = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+    log_p = np.log(p, out=np.zeros_like(p), where=p > 0)
+    return -np.sum(p * log_p, axis=1) + 0.0
+
+
+def _binned_category_counts(bin_ids, codes, n_bins, n_codes):
+    """(n_bins, n_codes) occurrence matrix of category codes per bin; code -1 (NULL) is skipped"""
+    valid = codes >= 0
+    flat = np.bincount(bin_ids[valid] * n_codes + codes[valid], minlength=n_bins * n_codes)
+    return flat.reshape(n_bins, n_codes)
+
+
+def _most_common(counts, values, default):
+    """Per-row most frequent value of a (rows, len(values)) count matrix, default for empty rows.
+    argmax ties pick the lowest code, i.e. the smallest value like pandas' mode()"""
+    labels = np.append(np.asarray(values, dtype=object), default)
+    if counts.shape[1] == 0:
+        return labels[np.zeros(len(counts), dtype=np.intp)]
+    return labels[np.where(counts.any(axis=1), counts.argmax(axis=1), len(values))]
+
+
+def _mode_filter(is_simulation):
+    """CRITICAL: Filter by mode to prevent contamination of live and simulation data"""
+    if is_simulation:
+        return APILog.is_simulation == True
+    # Live mode: only real endpoint traffic
+    return (APILog.is_simulation == False) | (APILog.is_simulation == None)
+
+
+def _query_window_aggregates(time_window_minutes, is_simulation, specific_endpoint=None, db=None):
+    """
+    Partial aggregates for the window, grouped by (endpoint, method, status_code):
+    count, non-null response-time count / sum / max, non-null payload count / sum.
+    Uses `db` if given (left open), otherwise a short-lived session.
+    """
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
+    try:
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(minutes=time_window_minutes)
+        
+        query = db.query(
+            APILog.endpoint,
+            APILog.method,
+            APILog.status_code,
+            func.count(),
+            func.count(APILog.response_time_ms),
+            func.sum(APILog.response_time_ms),
+            func.max(APILog.response_time_ms),
+            func.count(APILog.payload_size),
+            func.sum(APILog.payload_size)
+        ).filter(
+            APILog.timestamp >= start_time,
+            APILog.timestamp <= end_time,
+            _mode_filter(is_simulation)
+        )
+        if specific_endpoint:
+            query = query.filter(APILog.endpoint == specific_endpoint)
+        
+        return query.group_by(APILog.endpoint, APILog.method, APILog.status_code).all()
+    finally:
+        if owns_session:
+            db.close()
+
+
+def _top_key(counts):
+    """Most frequent key; ties resolve to the smallest key, like pandas' mode()"""
+    return min(counts.items(), key=lambda item: (-item[1], item[0]))[0]
+
+
+def _features_from_aggregates(rows):
+    """Build the window feature dict from _query_window_aggregates() rows"""
+    req_count = 0
+    error_count = 0
+    rt_count = rt_sum = 0
+    rt_max = None
+    payload_count = payload_sum = 0
+    endpoint_counts = Counter()
+    method_counts = Counter()
+    status_counts = Counter()
+    
+    for endpoint, method, status_code, count, n_rt, sum_rt, max_rt, n_payload, sum_payload in rows:
+        req_count += count
+        if status_code is not None:
+            status_counts[status_code] += count
+            if status_code >= 400:
+                error_count += count
+        rt_count += n_rt
+        rt_sum += sum_rt or 0.0
+        if max_rt is not None and (rt_max is None or max_rt > rt_max):
+            rt_max = max_rt
+        payload_count += n_payload
+        payload_sum += sum_payload or 0
+        if endpoint is not None:
+            endpoint_counts[endpoint] += count
+        if method is not None:
+            method_counts[method] += count
+    
+    unique_endpoints = len(endpoint_counts)
+    repeated_endpoints = sum(1 for c in endpoint_counts.values() if c > 1)
+    
+    return {
+        'req_count': req_count,
+        'error_rate': error_count / req_count if req_count > 0 else 0.0,
+        'avg_response_time': rt_sum / rt_count if rt_count else float('nan'),
+        'max_response_time': rt_max if rt_max is not None else float('nan'),
+        'payload_mean': payload_sum / payload_count if payload_count else float('nan'),
+        'unique_endpoints': unique_endpoints,
+        'repeat_rate': repeated_endpoints / unique_endpoints if unique_endpoints > 0 else 0.0,
+        'status_entropy': _shannon_entropy(list(status_counts.values())),
+        'endpoint': _top_key(endpoint_counts) if endpoint_counts else "/unknown",
+        'method': _top_key(method_counts) if method_counts else "GET"
+    }
 
 
 def extract_features_from_logs(time_window_minutes=1, is_simulation=False, specific_endpoint=None):
@@ -11,6 +161,9 @@ def extract_features_from_logs(time_window_minutes=1, is_simulation=False, speci
     
     STRICT SEPARATION: Only analyzes live OR simulation data, never mixed.
     
+    Aggregation is pushed down to the database: one query grouped by
+    (endpoint, method, status_code) instead of fetching every log row.
+    
     Args:
         time_window_minutes: Time window size for feature extraction
         is_simulation: If True, extract from simulation logs only. If False, extract from live logs only.
@@ -26,86 +179,33 @@ def extract_features_from_logs(time_window_minutes=1, is_simulation=False, speci
     - repeat_rate: Proportion of repeated endpoints
     - status_entropy: Shannon entropy of status code distribution
     """
-    db = SessionLocal()
-    try:
-        end_time = datetime.utcnow()
-        start_time = end_time - timedelta(minutes=time_window_minutes)
-        
-        # CRITICAL: Filter by mode to prevent contamination
-        if is_simulation:
-            query = db.query(APILog).filter(
-                APILog.timestamp >= start_time,
-                APILog.timestamp <= end_time,
-                APILog.is_simulation == True
-            )
-            if specific_endpoint:
-                query = query.filter(APILog.endpoint == specific_endpoint)
-            logs = query.all()
-        else:
-            # Live mode: only real endpoint traffic
-            query = db.query(APILog).filter(
-                APILog.timestamp >= start_time,
-                APILog.timestamp <= end_time,
-                (APILog.is_simulation == False) | (APILog.is_simulation == None)
-            )
-            if specific_endpoint:
-                query = query.filter(APILog.endpoint == specific_endpoint)
-            logs = query.all()
-        
-        if not logs:
-            return None
-        
-        df = pd.DataFrame([{
-            'timestamp': log.timestamp,
-            'endpoint': log.endpoint,
-            'method': log.method,
-            'response_time_ms': log.response_time_ms,
-            'status_code': log.status_code,
-            'payload_size': log.payload_size,
-            'ip_address': log.ip_address,
-            'user_id': log.user_id
-        } for log in logs])
-        
-        req_count = len(df)
-        
-        error_count = len(df[df['status_code'] >= 400])
-        error_rate = error_count / req_count if req_count > 0 else 0.0
-        
-        avg_response_time = df['response_time_ms'].mean()
-        max_response_time = df['response_time_ms'].max()
-        
-        payload_mean = df['payload_size'].mean()
-        
-        unique_endpoints = df['endpoint'].nunique()
-        
-        endpoint_counts = df['endpoint'].value_counts()
-        repeated_endpoints = (endpoint_counts > 1).sum()
-        repeat_rate = repeated_endpoints / unique_endpoints if unique_endpoints > 0 else 0.0
-        
-        status_counts = df['status_code'].value_counts()
-        status_probs = status_counts / status_counts.sum()
-        status_entropy = entropy(status_probs)
-        
-        most_common_endpoint = df['endpoint'].mode()[0] if len(df) > 0 else "/unknown"
-        most_common_method = df['method'].mode()[0] if len(df) > 0 else "GET"
-        
-        features = {
-            'req_count': req_count,
-            'error_rate': error_rate,
-            'avg_response_time': avg_response_time,
-            'max_response_time': max_response_time,
-            'payload_mean': payload_mean,
-            'unique_endpoints': unique_endpoints,
-            'repeat_rate': repeat_rate,
-            'status_entropy': status_entropy,
-            'endpoint': most_common_endpoint,
-            'method': most_common_method
-        }
-        
-        return features
-        
-    finally:
-        db.close()
+    rows = _query_window_aggregates(time_window_minutes, is_simulation, specific_endpoint)
+    if not rows:
+        return None
+    return _features_from_aggregates(rows)
+
+
+def extract_features_all_endpoints(time_window_minutes=1, is_simulation=False, db=None):
+    """
+    Per-endpoint features for every endpoint at once, equivalent to calling
+    extract_features_from_logs(..., specific_endpoint=endpoint) for each one,
+    from the same single grouped query.
+    
+    Pass `db` to run the query on an existing session.
+    
+    Returns:
+        dict mapping endpoint -> features; endpoints without traffic in the
+        window are absent.
+    """
+    rows_by_endpoint = {}
+    for row in _query_window_aggregates(time_window_minutes, is_simulation, db=db):
+        rows_by_endpoint.setdefault(row[0], []).append(row)
+    
+    return {
+        endpoint: _features_from_aggregates(rows)
+        for endpoint, rows in rows_by_endpoint.items()
+        if endpoint
+    }
 
 
 def prepare_training_data(hours_back=24):
@@ -118,81 +218,112 @@ def prepare_training_data(hours_back=24):
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(hours=hours_back)
         
-        logs = db.query(APILog).filter(
+        # Core select read straight into columns (no ORM hydration or per-row
+        # tuples); ORDER BY leaves the timestamps sorted, so the first/last
+        # rows bound the window range and no per-window time mask is needed
+        stmt = select(
+            APILog.timestamp,
+            APILog.endpoint,
+            APILog.method,
+            APILog.response_time_ms,
+            APILog.status_code,
+            APILog.payload_size
+        ).where(
             APILog.timestamp >= start_time,
             APILog.timestamp <= end_time
-        ).order_by(APILog.timestamp).all()
+        ).order_by(APILog.timestamp)
+        # Typed at read time: float64 numerics (NULL -> NaN) and categorical
+        # endpoint/method, whose codes feed the bincount histograms directly
+        df = pd.read_sql_query(stmt, db.connection(), parse_dates=['timestamp'], dtype={
+            'response_time_ms': 'float64',
+            'status_code': 'float64',
+            'payload_size': 'float64',
+            'endpoint': 'category',
+            'method': 'category'
+        })
         
-        if not logs:
+        if df.empty:
             return generate_synthetic_training_data()
         
-        df = pd.DataFrame([{
-            'timestamp': log.timestamp,
-            'endpoint': log.endpoint,
-            'method': log.method,
-            'response_time_ms': log.response_time_ms,
-            'status_code': log.status_code,
-            'payload_size': log.payload_size,
-            'ip_address': log.ip_address,
-            'user_id': log.user_id
-        } for log in logs])
+        # NumPy views of the columns
+        timestamps = df['timestamp'].to_numpy(dtype='datetime64[us]')
+        response_times = df['response_time_ms'].to_numpy()
+        status_codes = df['status_code'].to_numpy()
+        payload_sizes = df['payload_size'].to_numpy()
+        # Category codes are in sorted value order, so argmax ties pick the smallest
+        # value like mode(); NULLs have code -1 and are left out of the counts
+        endpoint_ids = df['endpoint'].cat.codes.to_numpy(dtype=np.intp)
+        endpoint_values = df['endpoint'].cat.categories
+        method_ids = df['method'].cat.codes.to_numpy(dtype=np.intp)
+        method_values = df['method'].cat.categories
+        del df
+        is_error = status_codes >= 400
+        
+        window_size = np.timedelta64(1, 'm')
+        step_size = np.timedelta64(30, 's')
+        
+        # 30-second bins anchored at the first log: window k covers
+        # [start + k*30s, start + k*30s + 1min), i.e. bins k and k + 1.
+        # Windows start every 30s while start + 1min <= last timestamp.
+        span = timestamps[-1] - timestamps[0]
+        n_windows = int((span - window_size) // step_size) + 1
+        if n_windows <= 0:
+            return generate_synthetic_training_data()
+        bin_ids = ((timestamps - timestamps[0]) // step_size).astype(np.intp)
+        n_bins = int(bin_ids[-1]) + 1
         
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
+        def per_window(per_bin):
+            """Sum adjacent bin rows into the overlapping 1-minute windows"""
+            return per_bin[:n_windows] + per_bin[1:n_windows + 1]
         
-        window_size = pd.Timedelta(minutes=1)
-        step_size = pd.Timedelta(seconds=30)
+        req_counts = per_window(np.bincount(bin_ids, minlength=n_bins))
+        # Integer counts over just the error rows (no float weights array per log)
+        error_counts = per_window(np.bincount(bin_ids[is_error], minlength=n_bins))
         
-        features_list = []
+        has_rt = ~np.isnan(response_times)
+        rt_sums = per_window(np.bincount(bin_ids[has_rt], weights=response_times[has_rt], minlength=n_bins))
+        rt_counts = per_window(np.bincount(bin_ids[has_rt], minlength=n_bins))
+        rt_max_by_bin = np.full(n_bins, np.nan)
+        np.fmax.at(rt_max_by_bin, bin_ids, response_times)  # fmax skips NaN like nanmax
+        rt_max = np.fmax(rt_max_by_bin[:n_windows], rt_max_by_bin[1:n_windows + 1])
         
-        current_start = df['timestamp'].min()
-        max_time = df['timestamp'].max()
+        has_payload = ~np.isnan(payload_sizes)
+        payload_sums = per_window(np.bincount(bin_ids[has_payload], weights=payload_sizes[has_payload], minlength=n_bins))
+        payload_counts = per_window(np.bincount(bin_ids[has_payload], minlength=n_bins))
         
-        while current_start + window_size <= max_time:
-            current_end = current_start + window_size
-            
-            window_df = df[(df['timestamp'] >= current_start) & (df['timestamp'] < current_end)]
-            
-            if len(window_df) > 0:
-                req_count = len(window_df)
-                error_count = len(window_df[window_df['status_code'] >= 400])
-                error_rate = error_count / req_count
-                
-                avg_response_time = window_df['response_time_ms'].mean()
-                max_response_time = window_df['response_time_ms'].max()
-                payload_mean = window_df['payload_size'].mean()
-                unique_endpoints = window_df['endpoint'].nunique()
-                
-                endpoint_counts = window_df['endpoint'].value_counts()
-                repeated_endpoints = (endpoint_counts > 1).sum()
-                repeat_rate = repeated_endpoints / unique_endpoints if unique_endpoints > 0 else 0.0
-                
-                status_counts = window_df['status_code'].value_counts()
-                status_probs = status_counts / status_counts.sum()
-                status_entropy = entropy(status_probs)
-                
-                most_common_endpoint = window_df['endpoint'].mode()[0]
-                most_common_method = window_df['method'].mode()[0]
-                
-                features_list.append({
-                    'req_count': req_count,
-                    'error_rate': error_rate,
-                    'avg_response_time': avg_response_time,
-                    'max_response_time': max_response_time,
-                    'payload_mean': payload_mean,
-                    'unique_endpoints': unique_endpoints,
-                    'repeat_rate': repeat_rate,
-                    'status_entropy': status_entropy,
-                    'endpoint': most_common_endpoint,
-                    'method': most_common_method
-                })
-            
-            current_start += step_size
+        endpoint_counts = per_window(_binned_category_counts(bin_ids, endpoint_ids, n_bins, len(endpoint_values)))
+        method_counts = per_window(_binned_category_counts(bin_ids, method_ids, n_bins, len(method_values)))
+        status_ids, status_values = pd.factorize(status_codes, sort=True)
+        status_counts = per_window(_binned_category_counts(bin_ids, status_ids, n_bins, len(status_values)))
         
-        if len(features_list) < 50:
+        # Only windows that contain logs become samples
+        keep = req_counts > 0
+        if int(keep.sum()) < 50:
             return generate_synthetic_training_data()
         
-        return pd.DataFrame(features_list)
+        req_counts = req_counts[keep]
+        endpoint_counts = endpoint_counts[keep]
+        method_counts = method_counts[keep]
+        unique_endpoints = (endpoint_counts > 0).sum(axis=1)
+        repeated_endpoints = (endpoint_counts > 1).sum(axis=1)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_response_time = rt_sums[keep] / rt_counts[keep]
+            payload_mean = payload_sums[keep] / payload_counts[keep]
+            repeat_rate = np.where(unique_endpoints > 0, repeated_endpoints / unique_endpoints, 0.0)
+        
+        return pd.DataFrame({
+            'req_count': req_counts,
+            'error_rate': error_counts[keep] / req_counts,
+            'avg_response_time': avg_response_time,
+            'max_response_time': rt_max[keep],
+            'payload_mean': payload_mean,
+            'unique_endpoints': unique_endpoints,
+            'repeat_rate': repeat_rate,
+            'status_entropy': _shannon_entropy_rows(status_counts[keep]),
+            'endpoint': _most_common(endpoint_counts, endpoint_values, "/unknown"),
+            'method': _most_common(method_counts, method_values, "GET")
+        })
         
     finally:
         db.close()
@@ -203,54 +334,22 @@ def generate_synthetic_training_data(n_samples=500):
     Generate synthetic training data for initial model training.
     This ensures the system can run even without historical data.
     """
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
     
     normal_samples = int(n_samples * 0.70)
     heavy_samples = int(n_samples * 0.20)
     bot_samples = n_samples - normal_samples - heavy_samples
+    cohort_sizes = (normal_samples, heavy_samples, bot_samples)
     
-    data = []
-    
-    for i in range(normal_samples):
-        data.append({
-            'req_count': np.random.randint(5, 30),
-            'error_rate': np.random.uniform(0.0, 0.15),
-            'avg_response_time': np.random.uniform(50, 300),
-            'max_response_time': np.random.uniform(100, 500),
-            'payload_mean': np.random.uniform(100, 2000),
-            'unique_endpoints': np.random.randint(2, 6),
-            'repeat_rate': np.random.uniform(0.1, 0.5),
-            'status_entropy': np.random.uniform(0.3, 1.2),
-            'endpoint': np.random.choice(['/login', '/search', '/payment', '/health']),
-            'method': np.random.choice(['GET', 'POST'])
-        })
-    
-    for i in range(heavy_samples):
-        data.append({
-            'req_count': np.random.randint(30, 80),
-            'error_rate': np.random.uniform(0.15, 0.35),
-            'avg_response_time': np.random.uniform(300, 700),
-            'max_response_time': np.random.uniform(500, 1200),
-            'payload_mean': np.random.uniform(1500, 5000),
-            'unique_endpoints': np.random.randint(3, 8),
-            'repeat_rate': np.random.uniform(0.4, 0.7),
-            'status_entropy': np.random.uniform(1.0, 2.0),
-            'endpoint': np.random.choice(['/login', '/search', '/payment', '/health']),
-            'method': np.random.choice(['GET', 'POST'])
-        })
-    
-    for i in range(bot_samples):
-        data.append({
-            'req_count': np.random.randint(80, 200),
-            'error_rate': np.random.uniform(0.30, 0.70),
-            'avg_response_time': np.random.uniform(700, 1500),
-            'max_response_time': np.random.uniform(1200, 3000),
-            'payload_mean': np.random.uniform(50, 500),
-            'unique_endpoints': np.random.randint(1, 3),
-            'repeat_rate': np.random.uniform(0.7, 0.95),
-            'status_entropy': np.random.uniform(0.1, 0.8),
-            'endpoint': np.random.choice(['/login', '/search', '/payment', '/health']),
-            'method': np.random.choice(['GET', 'POST'])
-        })
+    # One vectorized draw per column per cohort
+    frames = []
+    for size, ranges in zip(cohort_sizes, _SYNTHETIC_TRAINING_COHORTS):
+        columns = {
+            name: (rng.integers if name in _SYNTHETIC_INTEGER_FEATURES else rng.uniform)(low, high, size)
+            for name, (low, high) in ranges.items()
+        }
+        columns['endpoint'] = rng.choice(_SYNTHETIC_ENDPOINTS, size)
+        columns['method'] = rng.choice(['GET', 'POST'], size)
+        frames.append(pd.DataFrame(columns))
     
-    return pd.DataFrame(data)
+    return pd.concat(frames, ignore_index=True)
@@ -5,29 +5,75 @@ Generates targeted, realistic failure-prone anomalies per endpoint
 """
 import random
 import time
-from typing import Dict, List
+import numpy as np
+import pandas as pd
+from typing import Dict, List, NamedTuple, Tuple
+
+_rng = np.random.default_rng()
+
+_POST_ENDPOINTS = frozenset(['/sim/payment', '/sim/login', '/sim/signup'])
+
+_BOT_USER_AGENTS = [
+    'bot/1.0',
+    'scanner/2.0',
+    'curl/7.64.1',
+    'python-requests/2.26.0',
+    'automated-test/1.0'
+]
+
+_NORMAL_USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/96.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) Safari/605.1',
+    'Mozilla/5.0 (X11; Linux x86_64) Firefox/95.0',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0) Safari/604.1',
+]
+
+# One weighted pool for batch draws: 70% bot agents, 30% normal agents
+_USER_AGENT_POOL = np.array(_BOT_USER_AGENTS + _NORMAL_USER_AGENTS)
+_USER_AGENT_CDF = np.cumsum(
+    [0.7 / len(_BOT_USER_AGENTS)] * len(_BOT_USER_AGENTS)
+    + [0.3 / len(_NORMAL_USER_AGENTS)] * len(_NORMAL_USER_AGENTS)
+)[:-1]
+
+
+class Severity(NamedTuple):
+    """One severity tier: (low, high) ranges for the generated metrics"""
+    error_rate: Tuple[float, float]
+    latency_ms: Tuple[int, int]
+    failure_probability: Tuple[float, float]
+    priority: str
+
+
+class EndpointAnomaly(NamedTuple):
+    """The severe anomaly pattern injected into one endpoint"""
+    type: str
+    severity: Severity
+    description: str
+    error_codes: Tuple[int, ...]
+    repeat_rate: float
+    cluster: int
 
 
 class SeverityLevel:
     """Anomaly severity configurations"""
-    CRITICAL = {
-        'error_rate': (0.6, 0.9),  # 60-90% errors
-        'latency_ms': (3000, 8000),  # 3-8 second delays
-        'failure_probability': (0.75, 0.95),  # High failure risk
-        'priority': 'CRITICAL'
-    }
-    HIGH = {
-        'error_rate': (0.4, 0.6),
-        'latency_ms': (1500, 3000),
-        'failure_probability': (0.50, 0.75),
-        'priority': 'HIGH'
-    }
-    MEDIUM = {
-        'error_rate': (0.2, 0.4),
-        'latency_ms': (800, 1500),
-        'failure_probability': (0.25, 0.50),
-        'priority': 'MEDIUM'
-    }
+    CRITICAL = Severity(
+        error_rate=(0.6, 0.9),  # 60-90% errors
+        latency_ms=(3000, 8000),  # 3-8 second delays
+        failure_probability=(0.75, 0.95),  # High failure risk
+        priority='CRITICAL'
+    )
+    HIGH = Severity(
+        error_rate=(0.4, 0.6),
+        latency_ms=(1500, 3000),
+        failure_probability=(0.50, 0.75),
+        priority='HIGH'
+    )
+    MEDIUM = Severity(
+        error_rate=(0.2, 0.4),
+        latency_ms=(800, 1500),
+        failure_probability=(0.25, 0.50),
+        priority='MEDIUM'
+    )
 
 
 class HighSeverityInjector:
@@ -38,48 +84,130 @@ class HighSeverityInjector:
     
     # Map endpoints to specific severe anomaly patterns
     ENDPOINT_ANOMALY_MAP = {
-        '/sim/payment': {
-            'type': 'DATABASE_DEADLOCK',
-            'severity': SeverityLevel.CRITICAL,
-            'description': 'Database deadlock causing payment failures',
-            'error_codes': [500, 503, 504],
-            'repeat_rate': 0.9,  # High bot-like activity
-            'cluster': 2  # Bot cluster
-        },
-        '/sim/login': {
-            'type': 'AUTHENTICATION_FAILURE',
-            'severity': SeverityLevel.HIGH,
-            'description': 'Brute force attack causing auth failures',
-            'error_codes': [401, 429, 503],
-            'repeat_rate': 0.95,  # Very high repetition
-            'cluster': 2
-        },
-        '/sim/search': {
-            'type': 'MEMORY_LEAK',
-            'severity': SeverityLevel.HIGH,
-            'description': 'Memory leak causing slow responses',
-            'error_codes': [500, 503],
-            'repeat_rate': 0.3,
-            'cluster': 1  # Heavy usage
-        },
-        '/sim/profile': {
-            'type': 'API_RATE_LIMIT',
-            'severity': SeverityLevel.MEDIUM,
-            'description': 'Rate limit exceeded',
-            'error_codes': [429, 503],
-            'repeat_rate': 0.85,
-            'cluster': 2
-        },
-        '/sim/signup': {
-            'type': 'BACKEND_OVERLOAD',
-            'severity': SeverityLevel.CRITICAL,
-            'description': 'Backend service overload',
-            'error_codes': [503, 504, 500],
-            'repeat_rate': 0.4,
-            'cluster': 1
-        }
+        '/sim/payment': EndpointAnomaly(
+            type='DATABASE_DEADLOCK',
+            severity=SeverityLevel.CRITICAL,
+            description='Database deadlock causing payment failures',
+            error_codes=(500, 503, 504),
+            repeat_rate=0.9,  # High bot-like activity
+            cluster=2  # Bot cluster
+        ),
+        '/sim/login': EndpointAnomaly(
+            type='AUTHENTICATION_FAILURE',
+            severity=SeverityLevel.HIGH,
+            description='Brute force attack causing auth failures',
+            error_codes=(401, 429, 503),
+            repeat_rate=0.95,  # Very high repetition
+            cluster=2
+        ),
+        '/sim/search': EndpointAnomaly(
+            type='MEMORY_LEAK',
+            severity=SeverityLevel.HIGH,
+            description='Memory leak causing slow responses',
+            error_codes=(500, 503),
+            repeat_rate=0.3,
+            cluster=1  # Heavy usage
+        ),
+        '/sim/profile': EndpointAnomaly(
+            type='API_RATE_LIMIT',
+            severity=SeverityLevel.MEDIUM,
+            description='Rate limit exceeded',
+            error_codes=(429, 503),
+            repeat_rate=0.85,
+            cluster=2
+        ),
+        '/sim/signup': EndpointAnomaly(
+            type='BACKEND_OVERLOAD',
+            severity=SeverityLevel.CRITICAL,
+            description='Backend service overload',
+            error_codes=(503, 504, 500),
+            repeat_rate=0.4,
+            cluster=1
+        )
     }
     
+    @staticmethod
+    def _draw_batch(endpoint: str, batch_size: int) -> Tuple[str, EndpointAnomaly, str, Dict[str, np.ndarray]]:
+        """
+        Whole-batch draws shared by the row and columnar generators: each field
+        is one array instead of a random call per request.
+        
+        Returns:
+            (endpoint, anomaly config, session id, {field: array of batch_size})
+        """
+        anomaly_map = HighSeverityInjector.ENDPOINT_ANOMALY_MAP
+        config = anomaly_map.get(endpoint)
+        if config is None:
+            endpoint = '/sim/payment'  # Default to payment
+            config = anomaly_map[endpoint]
+        severity = config.severity
+        
+        session_id = f"session_{int(time.time())}"
+        n = batch_size
+        
+        error_rates = _rng.uniform(*severity.error_rate, size=n)
+        # Determine which requests fail
+        is_error = _rng.random(n) < error_rates
+        
+        # Select status code
+        statuses = np.where(is_error, _rng.choice(config.error_codes, n), _rng.choice([200, 201], n))
+        
+        # Errors have higher latency; successes are still slow (degraded performance)
+        latency_lo, latency_hi = severity.latency_ms
+        degraded_lo, degraded_hi = latency_lo * 0.6, latency_hi * 0.3
+        latencies = np.where(is_error,
+                             _rng.uniform(latency_lo, latency_hi, n),
+                             # random.uniform's a + (b - a) * U, which allows b < a (MEDIUM)
+                             degraded_lo + (degraded_hi - degraded_lo) * _rng.random(n))
+        
+        # Payload size (errors have smaller payloads)
+        payload_sizes = np.where(is_error, _rng.integers(50, 201, n), _rng.integers(500, 2001, n))
+        
+        # Repeated parameters (bot-like)
+        is_bot = _rng.random(n) < config.repeat_rate
+        user_numbers = _rng.integers(1, 51, n)
+        session_numbers = _rng.integers(1, 101, n)
+        
+        user_agents = _USER_AGENT_POOL[np.searchsorted(_USER_AGENT_CDF, _rng.random(n), side='right')]
+        
+        return endpoint, config, session_id, {
+            'status': statuses,
+            'latency': latencies,
+            'payload_size': payload_sizes,
+            'user_agent': user_agents,
+            'is_bot': is_bot,
+            'user_number': user_numbers,
+            'session_number': session_numbers,
+            'error_rate': error_rates
+        }
+    
+    @staticmethod
+    def generate_high_severity_frame(endpoint: str, batch_size: int = 100) -> pd.DataFrame:
+        """
+        Columnar version of generate_high_severity_batch(): one DataFrame
+        column per field, with no per-request dicts.
+        
+        The per-request parameters dict is flattened into a `session` column
+        and a boolean `retry` column (set for bot-like repeated requests).
+        """
+        endpoint, config, session_id, draws = HighSeverityInjector._draw_batch(endpoint, batch_size)
+        is_bot = draws['is_bot']
+        
+        return pd.DataFrame({
+            'method': 'POST' if endpoint in _POST_ENDPOINTS else 'GET',
+            'path': endpoint,
+            'status': draws['status'],
+            'latency': draws['latency'],
+            'payload_size': draws['payload_size'],
+            'user_agent': draws['user_agent'],
+            'session': np.where(is_bot, session_id, np.char.add('sess_', draws['session_number'].astype(str))),
+            'retry': is_bot,
+            'user_id': np.where(is_bot, f"bot_user_{session_id}", np.char.add('user_', draws['user_number'].astype(str))),
+            'error_rate': draws['error_rate'],
+            'is_severe': True,
+            'anomaly_type': config.type
+        })
+    
     @staticmethod
     def generate_high_severity_batch(endpoint: str, batch_size: int = 100) -> List[Dict]:
         """
@@ -91,103 +219,55 @@ class HighSeverityInjector:
             
         Returns:
             List of request dictionaries with severe anomaly patterns
+            (see generate_high_severity_frame() for a columnar batch)
         """
-        if endpoint not in HighSeverityInjector.ENDPOINT_ANOMALY_MAP:
-            endpoint = '/sim/payment'  # Default to payment
-        
-        config = HighSeverityInjector.ENDPOINT_ANOMALY_MAP[endpoint]
-        severity = config['severity']
+        endpoint, config, session_id, draws = HighSeverityInjector._draw_batch(endpoint, batch_size)
         
-        requests = []
-        session_id = f"session_{int(time.time())}"
-        
-        for i in range(batch_size):
-            # Determine if this request fails
-            error_rate = random.uniform(*severity['error_rate'])
-            is_error = random.random() < error_rate
-            
-            # Select status code
-            if is_error:
-                status = random.choice(config['error_codes'])
-            else:
-                status = random.choice([200, 201])
-            
-            # Generate latency
-            if is_error:
-                # Errors have higher latency
-                latency = random.uniform(*severity['latency_ms'])
-            else:
-                # Success but still slow (degraded performance)
-                latency = random.uniform(
-                    severity['latency_ms'][0] * 0.6,
-                    severity['latency_ms'][1] * 0.3
-                )
-            
-            # Payload size (errors have smaller payloads)
-            if is_error:
-                payload_size = random.randint(50, 200)  # Error messages
-            else:
-                payload_size = random.randint(500, 2000)
-            
-            # Repeated parameters (bot-like)
-            if random.random() < config['repeat_rate']:
-                user_id = f"bot_user_{session_id}"
-                params = {"session": session_id, "retry": "true"}
-            else:
-                user_id = f"user_{random.randint(1, 50)}"
-                params = {"session": f"sess_{random.randint(1, 100)}"}
-            
-            request = {
-                'method': 'POST' if endpoint in ['/sim/payment', '/sim/login', '/sim/signup'] else 'GET',
-                'path': endpoint,
-                'status': status,
-                'latency': latency,
-                'payload_size': payload_size,
-                'user_agent': _get_bot_user_agent() if random.random() < 0.7 else _get_normal_user_agent(),
-                'parameters': params,
-                'user_id': user_id,
-                'error_rate': error_rate,
-                'is_severe': True,
-                'anomaly_type': config['type']
-            }
-            
-            requests.append(request)
+        method = 'POST' if endpoint in _POST_ENDPOINTS else 'GET'
+        bot_user_id = f"bot_user_{session_id}"
+        anomaly_type = config.type
         
-        return requests
+        return [{
+            'method': method,
+            'path': endpoint,
+            'status': status,
+            'latency': latency,
+            'payload_size': payload_size,
+            'user_agent': user_agent,
+            'parameters': {"session": session_id, "retry": "true"} if bot else {"session": f"sess_{session_number}"},
+            'user_id': bot_user_id if bot else f"user_{user_number}",
+            'error_rate': error_rate,
+            'is_severe': True,
+            'anomaly_type': anomaly_type
+        } for status, latency, payload_size, user_agent, bot, user_number, session_number, error_rate in zip(
+            *(draws[field].tolist() for field in (
+                'status', 'latency', 'payload_size', 'user_agent',
+                'is_bot', 'user_number', 'session_number', 'error_rate'
+            ))
+        )]
     
     @staticmethod
     def get_expected_metrics(endpoint: str) -> Dict:
         """Get expected metrics for the anomaly"""
         config = HighSeverityInjector.ENDPOINT_ANOMALY_MAP.get(endpoint, 
                                                                  HighSeverityInjector.ENDPOINT_ANOMALY_MAP['/sim/payment'])
-        severity = config['severity']
+        severity = config.severity
         
         return {
-            'expected_error_rate': sum(severity['error_rate']) / 2,
-            'expected_latency': sum(severity['latency_ms']) / 2,
-            'expected_failure_probability': sum(severity['failure_probability']) / 2,
-            'expected_priority': severity['priority'],
-            'anomaly_type': config['type'],
-            'description': config['description']
+            'expected_error_rate': sum(severity.error_rate) / 2,
+            'expected_latency': sum(severity.latency_ms) / 2,
+            'expected_failure_probability': sum(severity.failure_probability) / 2,
+            'expected_priority': severity.priority,
+            'anomaly_type': config.type,
+            'description': config.description
         }
 
 
 def _get_bot_user_agent() -> str:
     """Get bot-like user agent"""
-    return random.choice([
-        'bot/1.0',
-        'scanner/2.0',
-        'curl/7.64.1',
-        'python-requests/2.26.0',
-        'automated-test/1.0'
-    ])
+    return random.choice(_BOT_USER_AGENTS)
 
 
 def _get_normal_user_agent() -> str:
     """Get normal user agent"""
-    return random.choice([
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/96.0',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) Safari/605.1',
-        'Mozilla/5.0 (X11; Linux x86_64) Firefox/95.0',
-        'Mozilla/5.0 (iPhone; CPU iPhone OS 15_0) Safari/604.1',
-    ])
+    return random.choice(_NORMAL_USER_AGENTS)
@@ -1,7 +1,26 @@
 import joblib
 import numpy as np
 import os
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional
+
+
+# Model input columns in training order, as (feature key, fallback key, default).
+# Training uses: request_rate, unique_endpoint_count, method_ratio, avg_payload_size,
+#                error_rate, repeated_parameter_ratio, user_agent_entropy,
+#                avg_response_time, max_response_time
+_FEATURE_SOURCES = (
+    ('req_count', 'request_rate', 10),
+    ('unique_endpoints', 'unique_endpoint_count', 5),
+    ('repeat_rate', 'method_ratio', 0.5),  # method_ratio (using repeat_rate as proxy)
+    ('payload_mean', 'avg_payload_size', 200),
+    ('error_rate', None, None),  # exists in both
+    ('repeat_rate', 'repeated_parameter_ratio', 0.3),
+    ('status_entropy', 'user_agent_entropy', 0.5),
+    ('avg_response_time', None, None),  # exists in both
+    ('max_response_time', None, None),  # exists in both
+)
 
 
 class MLInferenceEngine:
@@ -23,6 +42,8 @@ class MLInferenceEngine:
         self.kmeans = None
         self.random_forest = None
         self.bot_cluster = None
+        # One C-level lookup for the usual case where every primary feature key is present
+        self._get_features = itemgetter(*(key for key, _, _ in _FEATURE_SOURCES))
         
         self.load_models()
     
@@ -86,72 +107,86 @@ class MLInferenceEngine:
                 - risk_score: Final ensemble risk score [0, 1]
                 - priority: Risk priority level (LOW, MEDIUM, HIGH)
         """
+        # Map features to match training data format
+        return self.predict_batch(self._feature_vector(features))[0]
+    
+    def predict_batch(self, X: np.ndarray) -> List[Dict]:
+        """
+        Score N feature vectors with one call per model.
+        
+        Args:
+            X: (N, 9) array with columns in _FEATURE_SOURCES order
+        
+        Returns:
+            List of N prediction dicts, in the same format as predict()
+        """
         if not self.models_loaded:
             raise RuntimeError("Models not loaded")
         
-        # Map features to match training data format
-        # Training uses: request_rate, unique_endpoint_count, method_ratio, avg_payload_size,
-        #                error_rate, repeated_parameter_ratio, user_agent_entropy, 
-        #                avg_response_time, max_response_time
-        feature_vector = np.array([[
-            features.get('req_count', features.get('request_rate', 10)),  # request_rate
-            features.get('unique_endpoints', features.get('unique_endpoint_count', 5)),  # unique_endpoint_count
-            features.get('repeat_rate', features.get('method_ratio', 0.5)),  # method_ratio (using repeat_rate as proxy)
-            features.get('payload_mean', features.get('avg_payload_size', 200)),  # avg_payload_size
-            features['error_rate'],  # error_rate (exists in both)
-            features.get('repeat_rate', features.get('repeated_parameter_ratio', 0.3)),  # repeated_parameter_ratio
-            features.get('status_entropy', features.get('user_agent_entropy', 0.5)),  # user_agent_entropy
-            features['avg_response_time'],  # avg_response_time (exists in both)
-            features['max_response_time']  # max_response_time (exists in both)
-        ]])
-        
-        X_scaled = self.isolation_scaler.transform(feature_vector)
-        anomaly_score_raw = self.isolation_forest.decision_function(X_scaled)[0]
-        is_anomaly = self.isolation_forest.predict(X_scaled)[0] == -1
-        
-        anomaly_score_normalized = self._normalize_anomaly_score(anomaly_score_raw)
-        
-        usage_cluster = self.kmeans.predict(feature_vector)[0]
-        
-        failure_proba = self.random_forest.predict_proba(feature_vector)[0]
-        failure_probability = failure_proba[1] if len(failure_proba) > 1 else 0.0
-        
-        is_bot = 1.0 if usage_cluster == self.bot_cluster else 0.0
-        
-        risk_score = self._calculate_ensemble_risk(
-            anomaly_score_normalized,
-            failure_probability,
+        X = np.asarray(X, dtype=np.float64)
+        
+        X_scaled = self.isolation_scaler.transform(X)
+        anomaly_scores_raw = self.isolation_forest.decision_function(X_scaled)
+        # IsolationForest.predict() is -1 exactly where decision_function() < 0
+        is_anomaly = anomaly_scores_raw < 0
+        
+        anomaly_scores_normalized = self._normalize_anomaly_score(anomaly_scores_raw)
+        
+        usage_clusters = self.kmeans.predict(X)
+        
+        failure_proba = self.random_forest.predict_proba(X)
+        failure_probabilities = failure_proba[:, 1] if failure_proba.shape[1] > 1 else np.zeros(len(X))
+        
+        is_bot = (usage_clusters == self.bot_cluster).astype(np.float64)
+        
+        risk_scores = self._calculate_ensemble_risk(
+            anomaly_scores_normalized,
+            failure_probabilities,
             is_bot
         )
         
-        priority = self._determine_priority(risk_score)
-        
-        return {
-            'anomaly_score': float(anomaly_score_raw),
-            'is_anomaly': bool(is_anomaly),
-            'usage_cluster': int(usage_cluster),
-            'failure_probability': float(failure_probability),
-            'risk_score': float(risk_score),
-            'priority': priority
-        }
+        return [{
+            'anomaly_score': anomaly_score_raw,
+            'is_anomaly': anomalous,
+            'usage_cluster': usage_cluster,
+            'failure_probability': failure_probability,
+            'risk_score': risk_score,
+            'priority': self._determine_priority(risk_score)
+        } for anomaly_score_raw, anomalous, usage_cluster, failure_probability, risk_score in zip(
+            anomaly_scores_raw.tolist(), is_anomaly.tolist(), usage_clusters.tolist(),
+            failure_probabilities.tolist(), risk_scores.tolist()
+        )]
     
-    def _normalize_anomaly_score(self, score: float) -> float:
+    def _feature_vector(self, features: Dict) -> np.ndarray:
+        """
+        Build the (1, 9) model input from a feature dict in _FEATURE_SOURCES order.
+        Falls back to the alternate key / default per column only when a primary key is missing.
         """
-        Normalize Isolation Forest anomaly score to [0, 1] range.
+        try:
+            values = self._get_features(features)
+        except KeyError:
+            values = [
+                features[key] if fallback is None else features.get(key, features.get(fallback, default))
+                for key, fallback, default in _FEATURE_SOURCES
+            ]
+        return np.array([values], dtype=np.float64)
+    
+    def _normalize_anomaly_score(self, score: np.ndarray) -> np.ndarray:
+        """
+        Normalize Isolation Forest anomaly scores to [0, 1] range.
         
         Isolation Forest returns negative scores for anomalies.
         We normalize to 0-1 where higher = more anomalous.
         """
         normalized = -score
-        normalized = max(0.0, min(1.0, (normalized + 0.5) / 1.0))
-        return normalized
+        return np.clip((normalized + 0.5) / 1.0, 0.0, 1.0)
     
     def _calculate_ensemble_risk(
         self, 
-        anomaly_score: float, 
-        failure_prob: float, 
-        is_bot: float
-    ) -> float:
+        anomaly_score: np.ndarray, 
+        failure_prob: np.ndarray, 
+        is_bot: np.ndarray
+    ) -> np.ndarray:
         """
         Calculate ensemble risk score using weighted combination.
         
@@ -169,7 +204,7 @@ class MLInferenceEngine:
             0.20 * is_bot
         )
         
-        return max(0.0, min(1.0, risk))
+        return np.clip(risk, 0.0, 1.0)
     
     def _determine_priority(self, risk_score: float) -> str:
         """
@@ -188,4 +223,53 @@ class MLInferenceEngine:
             return "LOW"
 
 
+class BatchInferenceRunner:
+    """
+    Scores large feature batches through MLInferenceEngine.predict_batch()
+    on a thread pool.
+    
+    The sklearn tree and distance kernels release the GIL, so shards of one
+    batch score concurrently. Batches too small to split are scored inline.
+    """
+    
+    def __init__(self, engine: MLInferenceEngine, max_workers: Optional[int] = None,
+                 min_shard_size: int = 256):
+        self.engine = engine
+        self.max_workers = max_workers or min(os.cpu_count() or 1, 4)
+        self.min_shard_size = min_shard_size
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='inference')
+    
+    def predict_batch(self, X: np.ndarray) -> List[Dict]:
+        """
+        Score an (N, 9) array, split into at most max_workers shards.
+        
+        Returns:
+            List of N prediction dicts, in input order
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return []
+        
+        n_shards = min(self.max_workers, len(X) // self.min_shard_size)
+        if n_shards <= 1:
+            return self.engine.predict_batch(X)
+        
+        predictions = []
+        for shard_predictions in self._executor.map(self.engine.predict_batch, np.array_split(X, n_shards)):
+            predictions.extend(shard_predictions)
+        return predictions
+    
+    def predict_many(self, features: Iterable[Dict]) -> List[Dict]:
+        """Score a sequence of feature dicts (same keys as MLInferenceEngine.predict())"""
+        rows = [self.engine._feature_vector(f) for f in features]
+        if not rows:
+            return []
+        return self.predict_batch(np.vstack(rows))
+    
+    def shutdown(self, wait: bool = True):
+        """Release the worker threads"""
+        self._executor.shutdown(wait=wait)
+
+
 inference_engine = MLInferenceEngine()
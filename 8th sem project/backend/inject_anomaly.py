@@ -2,14 +2,76 @@
 Targeted anomaly injection script.
 Creates specific anomalous patterns for a chosen endpoint to demonstrate ML detection.
 """
-import requests
-import time
+import asyncio
+import httpx
+import orjson
 import random
+import statistics
 from datetime import datetime
 
 BASE_URL = "http://localhost:8000"
+MAX_CONCURRENT_REQUESTS = 100
+# Keep-alive pool shared by every injected request (reused instead of a TCP
+# connection per call); the semaphore keeps in-flight requests under the pool size
+CLIENT_LIMITS = httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS, max_keepalive_connections=50)
+_JSON_HEADERS = {"content-type": "application/json"}
+# A run where more than this share of requests fails is reported as an error
+MAX_FAILURE_RATIO = 0.5
 
-def inject_payment_anomaly():
+
+def _json_body(data):
+    """Request kwargs for a JSON body serialized once, so repeated POSTs reuse the bytes"""
+    return {"content": orjson.dumps(data), "headers": _JSON_HEADERS}
+
+
+async def _send(client, sem, delay, method, path, kwargs):
+    """
+    Send one request `delay` seconds from now.
+    Returns its latency in ms, or None on a transport/HTTP client error.
+    """
+    await asyncio.sleep(delay)
+    async with sem:
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            return None
+    return response.elapsed.total_seconds() * 1000
+
+
+async def _send_paced(client, sem, requests_to_send, interval):
+    """
+    Start one (method, path, kwargs) request every `interval` seconds without
+    waiting for earlier responses, so a phase takes N x interval, not N x RTT.
+    Returns the per-request results of _send().
+    """
+    return await asyncio.gather(*(
+        _send(client, sem, i * interval, method, path, kwargs)
+        for i, (method, path, kwargs) in enumerate(requests_to_send)
+    ))
+
+
+def _print_latency_summary(results):
+    """Print response count and p50/p95/p99 latency for one injection run"""
+    latencies = [ms for ms in results if ms is not None]
+    print(f"   - Responses: {len(latencies)}/{len(results)}")
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"   - Latency: p50={cuts[49]:.0f}ms p95={cuts[94]:.0f}ms p99={cuts[98]:.0f}ms")
+
+
+async def _run_injection(inject):
+    """Run one inject_* coroutine over a shared keep-alive client"""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    async with httpx.AsyncClient(base_url=BASE_URL, limits=CLIENT_LIMITS, timeout=2.0) as client:
+        results = await inject(client, sem)
+    _print_latency_summary(results)
+    
+    # Surface runs that produced little server-side load instead of reporting success
+    failed = results.count(None)
+    if failed > MAX_FAILURE_RATIO * len(results):
+        raise RuntimeError(f"{failed}/{len(results)} injected requests failed - is the backend reachable at {BASE_URL}?")
+
+async def inject_payment_anomaly(client, sem):
     """
     Create PAYMENT endpoint anomalies:
     - High error rate (invalid amounts, failed transactions)
@@ -18,51 +80,40 @@ def inject_payment_anomaly():
     """
     print("\n💳 INJECTING PAYMENT ENDPOINT ANOMALIES...")
     print("="*60)
+    results = []
     
     print("1️⃣  Generating rapid payment attempts (bot behavior)...")
-    for i in range(40):
-        try:
-            requests.post(f"{BASE_URL}/payment", json={
-                "user_id": "attacker_bot",
-                "amount": 0.01,  # Micro-transaction spam
-                "currency": "USD",
-                "card_number": "0000000000000000"
-            }, timeout=2)
-        except:
-            pass
-        time.sleep(0.03)  # Very fast - 33 requests/second
+    bot_body = _json_body({
+        "user_id": "attacker_bot",
+        "amount": 0.01,  # Micro-transaction spam
+        "currency": "USD",
+        "card_number": "0000000000000000"
+    })
+    results += await _send_paced(client, sem, [("POST", "/payment", bot_body)] * 40, 0.03)  # Very fast - 33 requests/second
     
     print("2️⃣  Generating high error rate (invalid transactions)...")
-    for i in range(25):
-        try:
-            requests.post(f"{BASE_URL}/payment", json={
-                "user_id": "fraud_user",
-                "amount": -random.uniform(100, 1000),  # Negative amounts
-                "currency": "INVALID",
-                "card_number": "1111"
-            }, timeout=2)
-        except:
-            pass
-        time.sleep(0.1)
+    results += await _send_paced(client, sem, [("POST", "/payment", _json_body({
+        "user_id": "fraud_user",
+        "amount": -random.uniform(100, 1000),  # Negative amounts
+        "currency": "INVALID",
+        "card_number": "1111"
+    })) for i in range(25)], 0.1)
     
     print("3️⃣  Generating large payload spam...")
-    for i in range(15):
-        try:
-            requests.post(f"{BASE_URL}/payment", json={
-                "user_id": "payload_attack_" + "X"*1000,  # Large user ID
-                "amount": 999999.99,
-                "currency": "USD" * 100,  # Repeated currency
-                "card_number": "4" * 500  # Huge card number
-            }, timeout=2)
-        except:
-            pass
-        time.sleep(0.05)
+    large_body = _json_body({
+        "user_id": "payload_attack_" + "X"*1000,  # Large user ID
+        "amount": 999999.99,
+        "currency": "USD" * 100,  # Repeated currency
+        "card_number": "4" * 500  # Huge card number
+    })
+    results += await _send_paced(client, sem, [("POST", "/payment", large_body)] * 15, 0.05)
     
     print("✅ Payment anomalies injected!")
     print(f"   - {40+25+15} = 80 anomalous requests generated")
     print(f"   - Expected: HIGH error rate, bot cluster detection")
+    return results
 
-def inject_login_anomaly():
+async def inject_login_anomaly(client, sem):
     """
     Create LOGIN endpoint anomalies:
     - Credential stuffing attack (rapid attempts)
@@ -71,35 +122,30 @@ def inject_login_anomaly():
     """
     print("\n🔐 INJECTING LOGIN ENDPOINT ANOMALIES...")
     print("="*60)
+    results = []
     
     print("1️⃣  Simulating credential stuffing attack...")
-    for i in range(50):
-        try:
-            requests.post(f"{BASE_URL}/login", json={
-                "username": f"victim@email.com",
-                "password": f"password{random.randint(1, 10000)}"
-            }, timeout=2)
-        except:
-            pass
-        time.sleep(0.02)  # 50 requests/second
+    results += await _send_paced(client, sem, [("POST", "/login", _json_body({
+        "username": f"victim@email.com",
+        "password": f"password{random.randint(1, 10000)}"
+    })) for i in range(50)], 0.02)  # 50 requests/second
     
     print("2️⃣  Simulating brute force with common passwords...")
     common_passwords = ["123456", "password", "admin", "12345678", "qwerty"]
-    for pwd in common_passwords * 10:  # 50 attempts
-        try:
-            requests.post(f"{BASE_URL}/login", json={
-                "username": "admin",
-                "password": pwd
-            }, timeout=2)
-        except:
-            pass
-        time.sleep(0.04)
+    password_bodies = [_json_body({
+        "username": "admin",
+        "password": pwd
+    }) for pwd in common_passwords]
+    results += await _send_paced(client, sem, [
+        ("POST", "/login", body) for body in password_bodies * 10  # 50 attempts
+    ], 0.04)
     
     print("✅ Login anomalies injected!")
     print(f"   - {50+50} = 100 anomalous requests generated")
     print(f"   - Expected: Bot-like behavior, HIGH risk score")
+    return results
 
-def inject_search_anomaly():
+async def inject_search_anomaly(client, sem):
     """
     Create SEARCH endpoint anomalies:
     - SQL injection attempts
@@ -108,6 +154,7 @@ def inject_search_anomaly():
     """
     print("\n🔍 INJECTING SEARCH ENDPOINT ANOMALIES...")
     print("="*60)
+    results = []
     
     print("1️⃣  Simulating SQL injection attempts...")
     sql_payloads = [
@@ -117,15 +164,10 @@ def inject_search_anomaly():
         "admin'--",
         "' OR 1=1--"
     ]
-    for payload in sql_payloads * 8:  # 40 attempts
-        try:
-            requests.get(f"{BASE_URL}/search", params={
-                "query": payload,
-                "limit": 100
-            }, timeout=2)
-        except:
-            pass
-        time.sleep(0.05)
+    results += await _send_paced(client, sem, [("GET", "/search", {"params": {
+        "query": payload,
+        "limit": 100
+    }}) for payload in sql_payloads * 8], 0.05)  # 40 attempts
     
     print("2️⃣  Simulating XSS payload attempts...")
     xss_payloads = [
@@ -134,32 +176,23 @@ def inject_search_anomaly():
         "javascript:alert('XSS')",
         "<svg/onload=alert('XSS')>"
     ]
-    for payload in xss_payloads * 10:  # 40 attempts
-        try:
-            requests.get(f"{BASE_URL}/search", params={
-                "query": payload,
-                "limit": 50
-            }, timeout=2)
-        except:
-            pass
-        time.sleep(0.04)
+    results += await _send_paced(client, sem, [("GET", "/search", {"params": {
+        "query": payload,
+        "limit": 50
+    }}) for payload in xss_payloads * 10], 0.04)  # 40 attempts
     
     print("3️⃣  Simulating search spam (scraping)...")
-    for i in range(30):
-        try:
-            requests.get(f"{BASE_URL}/search", params={
-                "query": f"product_{i}",
-                "limit": 100
-            }, timeout=2)
-        except:
-            pass
-        time.sleep(0.02)
+    results += await _send_paced(client, sem, [("GET", "/search", {"params": {
+        "query": f"product_{i}",
+        "limit": 100
+    }}) for i in range(30)], 0.02)
     
     print("✅ Search anomalies injected!")
     print(f"   - {40+40+30} = 110 anomalous requests generated")
     print(f"   - Expected: Bot detection, high request rate")
+    return results
 
-def inject_mixed_endpoint_anomaly():
+async def inject_mixed_endpoint_anomaly(client, sem):
     """
     Create anomalies across ALL endpoints:
     - Simulates sophisticated attack
@@ -168,6 +201,7 @@ def inject_mixed_endpoint_anomaly():
     """
     print("\n⚡ INJECTING MIXED ENDPOINT ANOMALIES...")
     print("="*60)
+    results = []
     
     print("Simulating distributed attack pattern...")
     endpoints = [
@@ -176,20 +210,16 @@ def inject_mixed_endpoint_anomaly():
         ("GET", "/search", {"query": "exploit", "limit": 10}),
     ]
     
-    for cycle in range(25):  # 75 total requests
-        for method, endpoint, data in endpoints:
-            try:
-                if method == "POST":
-                    requests.post(f"{BASE_URL}{endpoint}", json=data, timeout=2)
-                else:
-                    requests.get(f"{BASE_URL}{endpoint}", params=data, timeout=2)
-            except:
-                pass
-            time.sleep(0.02)
+    cycle_requests = [
+        (method, endpoint, _json_body(data) if method == "POST" else {"params": data})
+        for method, endpoint, data in endpoints
+    ]
+    results += await _send_paced(client, sem, cycle_requests * 25, 0.02)  # 75 total requests
     
     print("✅ Mixed anomalies injected!")
     print(f"   - 75 anomalous requests across all endpoints")
     print(f"   - Expected: Multiple HIGH risk detections")
+    return results
 
 def show_menu():
     print("\n" + "="*60)
@@ -206,7 +236,7 @@ def show_menu():
 def main():
     try:
         # Test connection
-        response = requests.get(f"{BASE_URL}/health", timeout=2)
+        response = httpx.get(f"{BASE_URL}/health", timeout=2)
         if response.status_code != 200:
             print("❌ Backend not running! Start it first.")
             return
@@ -217,13 +247,13 @@ def main():
             choice = input("Enter your choice (1-5): ").strip()
             
             if choice == "1":
-                inject_payment_anomaly()
+                asyncio.run(_run_injection(inject_payment_anomaly))
             elif choice == "2":
-                inject_login_anomaly()
+                asyncio.run(_run_injection(inject_login_anomaly))
             elif choice == "3":
-                inject_search_anomaly()
+                asyncio.run(_run_injection(inject_search_anomaly))
             elif choice == "4":
-                inject_mixed_endpoint_anomaly()
+                asyncio.run(_run_injection(inject_mixed_endpoint_anomaly))
             elif choice == "5":
                 print("\n👋 Exiting...")
                 break
@@ -243,7 +273,7 @@ def main():
             if again != 'y':
                 break
         
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print("❌ ERROR: Cannot connect to backend!")
         print("Start backend with: python app.py")
     except KeyboardInterrupt:
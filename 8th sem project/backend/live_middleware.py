@@ -4,13 +4,76 @@ Captures detailed request data and feeds to sliding window
 """
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
+import weakref
+import numpy as np
 import time
+from datetime import datetime
+from functools import lru_cache
 from database import SessionLocal, APILog
+from middleware import LIVE_ENDPOINTS, claim_request_logging
+from queued_logging import get_queued_logger
 from window_manager import live_window_manager
-from inference_enhanced import HybridDetectionEngine
+from inference_enhanced import HybridDetectionEngine, get_engine
 from mode_isolation import live_manager
-from typing import Optional
-import json
+from typing import Dict, List, Optional
+import orjson
+
+logger = get_queued_logger(__name__)
+
+# Live request logs are written in batches: up to LOG_BATCH_SIZE rows, or
+# whatever arrived within LOG_FLUSH_INTERVAL seconds of the first queued row
+LOG_BATCH_SIZE = 50
+LOG_FLUSH_INTERVAL = 0.1
+LOG_QUEUE_MAXSIZE = 10000
+
+# Request bodies are only buffered to read JSON parameter names, and only on
+# these endpoints when Content-Length is below MAX_PARSED_BODY_BYTES;
+# payload_size otherwise comes from Content-Length (or, without one, from the
+# bytes the endpoint reads) and the endpoint reads the original stream
+JSON_PARAM_ENDPOINTS = frozenset({'/payment', '/login', '/signup'})
+MAX_PARSED_BODY_BYTES = 8192
+
+# Window features fed to the detection engine, in model order
+LIVE_FEATURE_NAMES = (
+    'request_rate', 'unique_endpoint_count', 'method_ratio', 'avg_payload_size',
+    'error_rate', 'repeated_parameter_ratio', 'user_agent_entropy',
+    'avg_response_time', 'max_response_time'
+)
+# Steady live traffic repeats the same window features once rounded, so
+# predictions are memoized on the rounded tuple
+PREDICTION_CACHE_SIZE = 256
+PREDICTION_KEY_DECIMALS = 2
+# Reused model-input buffer; detection runs on the event loop thread only
+_FEATURES_BUF = np.empty((1, len(LIVE_FEATURE_NAMES)))
+
+
+def _count_streamed_bytes(request: Request) -> List[int]:
+    """
+    Count request body bytes as the endpoint receives them, without buffering.
+    Returns a one-item list holding the running total.
+    """
+    total = [0]
+    receive = request._receive
+    
+    async def counting_receive():
+        message = await receive()
+        if message["type"] == "http.request":
+            total[0] += len(message.get("body", b""))
+        return message
+    
+    request._receive = counting_receive
+    return total
+
+
+# Live middleware instances, so app shutdown can flush their pending log rows
+_live_middlewares = weakref.WeakSet()
+
+
+@lru_cache(maxsize=PREDICTION_CACHE_SIZE)
+def _predict_cached(detection_engine, feature_key):
+    """predict_anomaly() for a rounded feature tuple (in LIVE_FEATURE_NAMES order)"""
+    return detection_engine.predict_anomaly(dict(zip(LIVE_FEATURE_NAMES, feature_key)), out=_FEATURES_BUF)
 
 
 class EnhancedLoggingMiddleware(BaseHTTPMiddleware):
@@ -24,19 +87,72 @@ class EnhancedLoggingMiddleware(BaseHTTPMiddleware):
     BLACKLIST: Everything else (/, /health, /metrics, /docs, /api/*, /ws, etc.)
     """
     
-    # WHITELIST - ONLY these endpoints are tracked
-    WHITELISTED_ENDPOINTS = {
-        '/login',
-        '/signup', 
-        '/search',
-        '/profile',
-        '/payment',
-        '/logout'
-    }
+    # WHITELIST - ONLY these endpoints are tracked (same set as LoggingMiddleware)
+    WHITELISTED_ENDPOINTS = LIVE_ENDPOINTS
     
     def __init__(self, app, detection_engine: Optional[HybridDetectionEngine] = None):
         super().__init__(app)
-        self.detection_engine = detection_engine or HybridDetectionEngine()
+        self.detection_engine = detection_engine or get_engine()
+        # Created on the first tracked request, inside the server's event loop
+        self._log_queue: Optional[asyncio.Queue] = None
+        self._log_flusher: Optional[asyncio.Task] = None
+        # Rows the flusher has taken off the queue but not yet handed to a writer
+        self._pending_rows: List[Dict] = []
+        _live_middlewares.add(self)
+    
+    def _write_logs(self, rows: List[Dict]):
+        """Blocking write of one batch of APILog rows (runs in a worker thread)"""
+        db = SessionLocal()
+        try:
+            # One executemany INSERT and one commit for the whole batch
+            db.execute(APILog.__table__.insert(), rows)
+            db.commit()
+        except Exception as e:
+            logger.error("Error logging to database: %s", e)
+            db.rollback()
+        finally:
+            db.close()
+    
+    async def _flush_logs(self):
+        """Background task: drain the log queue into batched inserts, off the request path"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._pending_rows = rows = [await self._log_queue.get()]
+            deadline = loop.time() + LOG_FLUSH_INTERVAL
+            while len(rows) < LOG_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(await asyncio.wait_for(self._log_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._pending_rows = []
+            await asyncio.to_thread(self._write_logs, rows)
+    
+    async def _enqueue_log(self, row: Dict):
+        """Queue one APILog row for the batch writer, starting it if needed"""
+        if self._log_flusher is None or self._log_flusher.done():
+            self._log_queue = asyncio.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+            self._log_flusher = asyncio.create_task(self._flush_logs())
+        await self._log_queue.put(row)
+    
+    async def close(self):
+        """Stop the batch writer and write every row still pending or queued"""
+        if self._log_flusher is None:
+            return
+        self._log_flusher.cancel()
+        try:
+            await self._log_flusher
+        except asyncio.CancelledError:
+            pass
+        self._log_flusher = None
+        
+        rows, self._pending_rows = self._pending_rows, []
+        while not self._log_queue.empty():
+            rows.append(self._log_queue.get_nowait())
+        if rows:
+            await asyncio.to_thread(self._write_logs, rows)
         
     async def dispatch(self, request: Request, call_next):
         # STRICT FILTERING
@@ -52,72 +168,76 @@ class EnhancedLoggingMiddleware(BaseHTTPMiddleware):
         if request.method not in ["GET", "POST"]:
             return await call_next(request)
         
-        start_time = time.time()
+        # 4. Already tracked by another logging middleware on this app
+        if not claim_request_logging(request):
+            return await call_next(request)
+        
+        # Monotonic integer clock: immune to wall-clock adjustments, ns resolution
+        start_ns = time.monotonic_ns()
         
         # Extract request data
         method = request.method
         path = request.url.path
         user_agent = request.headers.get('user-agent', 'unknown')
         
-        # Extract query parameters
-        parameters = dict(request.query_params)
+        # Parameter names only: the window features count repeated names, so
+        # values (e.g. large JSON fields) are not copied or kept in the window
+        parameters = dict.fromkeys(request.query_params)
         
         # Get payload size for POST/PUT/PATCH
         body = None
         payload_size = 0
+        streamed_bytes = None
         
         if method in ["POST", "PUT", "PATCH"]:
-            try:
-                body = await request.body()
-                payload_size = len(body) if body else 0
-                
-                # Try to parse parameters from JSON body
-                if body:
-                    try:
-                        body_params = json.loads(body)
-                        if isinstance(body_params, dict):
-                            parameters.update(body_params)
-                    except:
-                        pass
-                
-                # Restore body for endpoint processing
-                async def receive():
-                    return {"type": "http.request", "body": body}
-                
-                request._receive = receive
-            except:
-                payload_size = 0
+            content_length = request.headers.get('content-length', '')
+            if not content_length.isdigit():
+                # No declared size (e.g. chunked upload): never buffered here;
+                # payload_size is the byte count the endpoint actually reads
+                streamed_bytes = _count_streamed_bytes(request)
+            elif path in JSON_PARAM_ENDPOINTS and int(content_length) < MAX_PARSED_BODY_BYTES:
+                # Only small JSON bodies of the form endpoints are buffered and parsed
+                try:
+                    body = await request.body()  # BaseHTTPMiddleware replays this cached body downstream
+                    payload_size = len(body) if body else 0
+                    
+                    # Try to parse parameters from JSON body
+                    if body:
+                        try:
+                            body_params = orjson.loads(body)
+                            if isinstance(body_params, dict):
+                                parameters.update(dict.fromkeys(body_params))
+                        except:
+                            pass
+                except:
+                    payload_size = 0
+            else:
+                # Size straight from the header; the body streams through untouched
+                payload_size = int(content_length)
         
         # Process request
         response = await call_next(request)
+        if streamed_bytes is not None:
+            payload_size = streamed_bytes[0]
         
         # Calculate latency
-        latency_ms = (time.time() - start_time) * 1000
+        latency_ms = (time.monotonic_ns() - start_ns) / 1_000_000
         status_code = response.status_code
         
-        # Store in database (exactly once per whitelisted request)
-        db = SessionLocal()
-        try:
-            log_entry = APILog(
-                endpoint=path,
-                method=method,
-                response_time_ms=latency_ms,
-                status_code=status_code,
-                payload_size=payload_size,
-                ip_address=request.client.host if request.client else "unknown",
-                user_id=getattr(request.state, "user_id", None)
-            )
-            db.add(log_entry)
-            db.commit()
-            
-            # Increment live manager counter ONLY after successful DB commit
-            # This ensures exactly 1 count per manual API call
-            live_manager.increment_request(path, latency_ms, status_code)
-        except Exception as e:
-            print(f"Error logging to database: {e}")
-            # If DB fails, don't increment counter
-        finally:
-            db.close()
+        # Count exactly once per whitelisted request, then queue the log row
+        # for the batch writer (the DB commit is no longer on the request path)
+        live_manager.increment_request(path, latency_ms, status_code)
+        await self._enqueue_log({
+            'timestamp': datetime.utcnow(),
+            'endpoint': path,
+            'method': method,
+            'response_time_ms': latency_ms,
+            'status_code': status_code,
+            'payload_size': payload_size,
+            'ip_address': request.client.host if request.client else "unknown",
+            'user_id': getattr(request.state, "user_id", None),
+            'is_simulation': False
+        })
         
         # Feed to sliding window (LIVE MODE) - ONLY for feature extraction
         features = live_window_manager.add_request(
@@ -133,27 +253,39 @@ class EnhancedLoggingMiddleware(BaseHTTPMiddleware):
         # If window is full, run ML inference
         if features:
             try:
-                prediction = self.detection_engine.predict_anomaly(features)
+                start = time.perf_counter()
+                feature_key = tuple(round(features[name], PREDICTION_KEY_DECIMALS) for name in LIVE_FEATURE_NAMES)
+                # Copy so the cached result is never modified; report this call's latency
+                prediction = dict(
+                    _predict_cached(self.detection_engine, feature_key),
+                    detection_latency_ms=(time.perf_counter() - start) * 1000
+                )
                 
                 # Store prediction result
-                print(f"\n🔍 LIVE MODE DETECTION (Window #{features['window_id']}):")
-                print(f"   Risk Score: {prediction['risk_score']:.4f}")
-                print(f"   Priority: {prediction['priority']}")
-                print(f"   Is Anomaly: {prediction['is_anomaly']}")
-                print(f"   Detection Method: {prediction['detection_method']}")
-                if 'details' in prediction and prediction['details'].get('rule_alerts'):
-                    print(f"   Rule Alerts: {', '.join(prediction['details']['rule_alerts'])}")
-                print(f"   Latency: {prediction['detection_latency_ms']:.2f}ms\n")
+                rule_alerts = prediction.get('details', {}).get('rule_alerts')
+                logger.info("\n🔍 LIVE MODE DETECTION (Window #%s):\n"
+                            "   Risk Score: %.4f\n   Priority: %s\n   Is Anomaly: %s\n"
+                            "   Detection Method: %s\n%s   Latency: %.2fms\n",
+                            features['window_id'], prediction['risk_score'], prediction['priority'],
+                            prediction['is_anomaly'], prediction['detection_method'],
+                            f"   Rule Alerts: {', '.join(rule_alerts)}\n" if rule_alerts else '',
+                            prediction['detection_latency_ms'])
                 
                 # Broadcast via WebSocket (will implement in app.py)
                 # This will be handled by the app when we update it
                 
             except Exception as e:
-                print(f"Error in ML inference: {e}")
+                logger.exception("Error in ML inference: %s", e)
         
         return response
 
 
+async def close_live_middlewares():
+    """Flush the queued request logs of every live middleware (app shutdown hook)"""
+    for middleware in list(_live_middlewares):
+        await middleware.close()
+
+
 def get_live_stats():
     """
     Uses isolated live manager for strict mode separation.
@@ -170,5 +302,6 @@ def get_live_stats():
         'window_size': window_info['window_size'],
         'is_window_full': window_info['is_full'],
         'last_inference': window_info['last_inference'],
+        'prediction_cache': _predict_cached.cache_info()._asdict(),
         'status': 'active' if live_stats['total_requests'] > 0 else 'idle'
     }
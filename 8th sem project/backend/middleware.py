@@ -1,8 +1,13 @@
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
 import time
+from collections import deque
 from database import SessionLocal, APILog
-import sys
+from queued_logging import get_queued_logger
+
+# Rolling window of recent live response times
+RESPONSE_TIME_WINDOW = 100
 
 # Live mode stats - ONLY real endpoint hits
 live_mode_stats = {
@@ -12,38 +17,74 @@ live_mode_stats = {
     'anomalies_detected': 0,
     'total_response_time': 0.0,
     'error_count': 0,
-    'response_times': []
+    'response_times': deque(maxlen=RESPONSE_TIME_WINDOW),
+    'recent_response_time_total': 0.0  # sum of response_times, kept incrementally
 }
 
+# Live request logging goes through the shared queue so the event loop never
+# blocks on console writes; a background listener thread does the actual I/O.
+logger = get_queued_logger(__name__)
+
 # ONLY these endpoints count as live traffic
-LIVE_ENDPOINTS = {'/login', '/payment', '/search', '/profile', '/signup', '/logout'}
+LIVE_ENDPOINTS = frozenset({'/login', '/payment', '/search', '/profile', '/signup', '/logout'})
+
+
+def claim_request_logging(request: Request) -> bool:
+    """
+    Mark a request as logged; False if another logging middleware already claimed it.
+    
+    LoggingMiddleware and EnhancedLoggingMiddleware share this flag on the request
+    state, so an app that registers both still logs and counts each request once.
+    """
+    if getattr(request.state, 'api_logged', False):
+        return False
+    request.state.api_logged = True
+    return True
+
+def _write_log(row: dict) -> bool:
+    """Blocking insert + commit of one APILog row (runs in a worker thread); True on success"""
+    db = SessionLocal()
+    try:
+        db.add(APILog(**row))
+        db.commit()
+        return True
+    except Exception as e:
+        logger.error("Error logging API call: %s", e)
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
 
 class LoggingMiddleware(BaseHTTPMiddleware):
     """Tracks ONLY LIVE MODE requests from real endpoint hits."""
     
     async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+        endpoint = request.url.path
+        
+        # CRITICAL: Only count real business endpoints as live traffic. One set
+        # lookup up front: everything else passes straight through with no body
+        # buffering or timing, as do requests another logging middleware claimed
+        if endpoint not in LIVE_ENDPOINTS or not claim_request_logging(request):
+            return await call_next(request)
+        
+        # Monotonic integer clock: immune to wall-clock adjustments, ns resolution
+        start_ns = time.monotonic_ns()
         
         body = None
         payload_size = 0
         
         if request.method in ["POST", "PUT", "PATCH"]:
             try:
-                body = await request.body()
+                body = await request.body()  # BaseHTTPMiddleware replays this cached body downstream
                 payload_size = len(body) if body else 0
-                
-                async def receive():
-                    return {"type": "http.request", "body": body}
-                
-                request._receive = receive
             except:
                 payload_size = 0
         
         response = await call_next(request)
         
-        process_time = (time.time() - start_time) * 1000
+        process_time = (time.monotonic_ns() - start_ns) / 1_000_000
         
-        endpoint = request.url.path
         method = request.method
         status_code = response.status_code
         ip_address = request.client.host if request.client else "unknown"
@@ -52,53 +93,43 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         if hasattr(request.state, "user_id"):
             user_id = request.state.user_id
         
-        # CRITICAL: Only count real business endpoints as live traffic
-        is_live_request = endpoint in LIVE_ENDPOINTS
+        # The blocking INSERT + commit runs in a worker thread, off the event loop
+        logged = await asyncio.to_thread(_write_log, {
+            'endpoint': endpoint,
+            'method': method,
+            'response_time_ms': process_time,
+            'status_code': status_code,
+            'payload_size': payload_size,
+            'ip_address': ip_address,
+            'user_id': user_id,
+            'is_simulation': False
+        })
         
-        # Only log and count LIVE endpoints
-        if is_live_request:
-            db = SessionLocal()
-            try:
-                log_entry = APILog(
-                    endpoint=endpoint,
-                    method=method,
-                    response_time_ms=process_time,
-                    status_code=status_code,
-                    payload_size=payload_size,
-                    ip_address=ip_address,
-                    user_id=user_id,
-                    is_simulation=False
-                )
-                db.add(log_entry)
-                db.commit()
-                
-                # Increment LIVE mode counter
-                if True:
-                    global live_mode_stats
-                    live_mode_stats['total_requests'] += 1
-                    if live_mode_stats['start_time'] is None:
-                        live_mode_stats['start_time'] = time.time()
-                    
-                    # Track response time
-                    live_mode_stats['total_response_time'] += process_time
-                    live_mode_stats['response_times'].append(process_time)
-                    if len(live_mode_stats['response_times']) > 100:
-                        live_mode_stats['response_times'].pop(0)
-                    
-                    # Track errors
-                    if status_code >= 400:
-                        live_mode_stats['error_count'] += 1
-                    
-                    # Calculate metrics
-                    avg_response_time = sum(live_mode_stats['response_times']) / len(live_mode_stats['response_times']) if live_mode_stats['response_times'] else 0
-                    error_rate = live_mode_stats['error_count'] / live_mode_stats['total_requests'] if live_mode_stats['total_requests'] > 0 else 0
-                    
-                    print(f"[LIVE] Request #{live_mode_stats['total_requests']}: {method} {endpoint} - {process_time:.2f}ms - Status {status_code}")
-                    
-            except Exception as e:
-                print(f"Error logging API call: {e}", file=sys.stderr)
-                db.rollback()
-            finally:
-                db.close()
+        # Increment LIVE mode counter ONLY after a successful commit
+        if logged:
+            global live_mode_stats
+            live_mode_stats['total_requests'] += 1
+            if live_mode_stats['start_time'] is None:
+                live_mode_stats['start_time'] = time.time()
+            
+            # Track response time
+            live_mode_stats['total_response_time'] += process_time
+            recent_times = live_mode_stats['response_times']
+            if len(recent_times) == recent_times.maxlen:
+                # append() below evicts the oldest time
+                live_mode_stats['recent_response_time_total'] -= recent_times[0]
+            recent_times.append(process_time)
+            live_mode_stats['recent_response_time_total'] += process_time
+            
+            # Track errors
+            if status_code >= 400:
+                live_mode_stats['error_count'] += 1
+            
+            # Calculate metrics
+            avg_response_time = live_mode_stats['recent_response_time_total'] / len(recent_times)
+            error_rate = live_mode_stats['error_count'] / live_mode_stats['total_requests'] if live_mode_stats['total_requests'] > 0 else 0
+            
+            logger.info("[LIVE] Request #%d: %s %s - %.2fms - Status %d",
+                        live_mode_stats['total_requests'], method, endpoint, process_time, status_code)
         
         return response
@@ -36,6 +36,20 @@ class APILogResponse(BaseModel):
         from_attributes = True
 
 
+class APILogSummary(BaseModel):
+    id: int
+    timestamp: datetime
+    endpoint: str
+    method: str
+    status_code: int
+    response_time_ms: float
+    payload_size: int
+    ip_address: str
+
+    class Config:
+        from_attributes = True
+
+
 class ResolutionSuggestion(BaseModel):
     category: str
     action: str
@@ -90,6 +104,20 @@ class AnomalyResponse(BaseModel):
         from_attributes = True
 
 
+class AnomalySummary(BaseModel):
+    id: int
+    timestamp: datetime
+    endpoint: str
+    method: str
+    risk_score: float
+    priority: str
+    is_anomaly: bool
+    failure_probability: float
+
+    class Config:
+        from_attributes = True
+
+
 class AdminQueryRequest(BaseModel):
     query: str
 
@@ -4,10 +4,10 @@ Handles CSV format with 'classification' column (Normal/Anomalous)
 """
 
 import pandas as pd
+import numpy as np
 import re
 from pathlib import Path
-from collections import Counter
-import math
+from scipy.special import entr
 
 
 class CSICCSVProcessor:
@@ -174,6 +174,33 @@ class CSICCSVProcessor:
         """Aggregate requests into time windows and extract enhanced ML features"""
         features_list = []
         
+        n = len(requests)
+        window_starts = np.arange(0, n, window_size)
+        window_ids = np.arange(n) // window_size
+        
+        # 4xx/5xx counts for every window in one pass over precomputed error flags
+        is_error = np.fromiter((r['status_code'] >= 400 for r in requests), dtype=bool, count=n)
+        error_counts = np.add.reduceat(is_error, window_starts, dtype=np.intp).tolist() if n else []
+        
+        # Mode count of num_params per window: factorize once, then one
+        # (n_windows, n_values) histogram instead of a Counter per window
+        param_codes, param_values = pd.factorize(np.fromiter((r['num_params'] for r in requests), dtype=np.int64, count=n))
+        n_param_values = len(param_values)
+        param_histogram = np.bincount(
+            window_ids * n_param_values + param_codes, minlength=len(window_starts) * n_param_values
+        ).reshape(len(window_starts), n_param_values)
+        top_param_counts = param_histogram.max(axis=1).tolist() if n else []
+        
+        # Shannon entropy (bits) of user agents per window from the same kind of
+        # histogram: entr(p) = -p*ln(p) over each row, no per-window Counter
+        ua_codes, ua_values = pd.factorize(np.array([r['user_agent'] for r in requests], dtype=object))
+        n_ua_values = len(ua_values)
+        ua_histogram = np.bincount(
+            window_ids * n_ua_values + ua_codes, minlength=len(window_starts) * n_ua_values
+        ).reshape(len(window_starts), n_ua_values)
+        ua_probs = ua_histogram / np.maximum(ua_histogram.sum(axis=1, keepdims=True), 1)
+        user_agent_entropies = (entr(ua_probs).sum(axis=1) / np.log(2)).tolist()
+        
         # Process in chunks (simulate time windows)
         for i in range(0, len(requests), window_size):
             window = requests[i:i+window_size]
@@ -196,22 +223,15 @@ class CSICCSVProcessor:
             avg_payload_size = sum(r['payload_size'] for r in window) / len(window)
             
             # Feature 5: error_rate (4xx/5xx status codes)
-            errors = sum(1 for r in window if r['status_code'] >= 400)
+            errors = error_counts[i // window_size]
             error_rate = errors / len(window)
             
             # Feature 6: repeated_parameter_ratio
-            params = [r['num_params'] for r in window]
-            most_common_param = Counter(params).most_common(1)[0][1] if params else 1
+            most_common_param = top_param_counts[i // window_size]
             repeated_parameter_ratio = most_common_param / len(window)
             
             # Feature 7: user_agent_entropy
-            user_agents = [r['user_agent'] for r in window]
-            ua_counts = Counter(user_agents)
-            total = sum(ua_counts.values())
-            user_agent_entropy = 0
-            if total > 0:
-                user_agent_entropy = -sum((count/total) * math.log2(count/total) 
-                                          for count in ua_counts.values() if count > 0)
+            user_agent_entropy = user_agent_entropies[i // window_size]
             
             # Additional features for compatibility
             avg_response_time = sum(r['response_time_ms'] for r in window) / len(window)
@@ -11,8 +11,9 @@ Supported filenames:
 import pandas as pd
 import re
 from pathlib import Path
-from collections import Counter
-import math
+from datasets_manager import (
+    WINDOW_FEATURE_COLUMNS, WINDOW_FEATURE_DTYPES, requests_to_columns, window_feature_matrix
+)
 
 
 class CSICProcessor:
@@ -90,56 +91,14 @@ class CSICProcessor:
     
     def aggregate_to_windows(self, requests, window_size=60):
         """Aggregate requests into time windows and extract 8 ML features"""
-        features_list = []
+        if not requests:
+            return pd.DataFrame()
         
-        # Process in chunks (simulate time windows)
-        for i in range(0, len(requests), window_size):
-            window = requests[i:i+window_size]
-            if len(window) < 5:  # Skip very small windows
-                continue
-            
-            # Feature 1: req_count
-            req_count = len(window)
-            
-            # Feature 2: error_rate
-            errors = sum(1 for r in window if r['status_code'] >= 400)
-            error_rate = errors / len(window) if window else 0
-            
-            # Feature 3: avg_response_time
-            avg_response_time = sum(r['response_time_ms'] for r in window) / len(window)
-            
-            # Feature 4: max_response_time
-            max_response_time = max(r['response_time_ms'] for r in window)
-            
-            # Feature 5: payload_mean
-            payload_mean = sum(r['payload_size'] for r in window) / len(window)
-            
-            # Feature 6: unique_endpoints
-            unique_endpoints = len(set(r['endpoint'] for r in window))
-            
-            # Feature 7: repeat_rate
-            endpoints = [r['endpoint'] for r in window]
-            most_common_count = Counter(endpoints).most_common(1)[0][1] if endpoints else 1
-            repeat_rate = most_common_count / len(window) if window else 0
-            
-            # Feature 8: status_entropy
-            status_codes = [r['status_code'] for r in window]
-            status_counts = Counter(status_codes)
-            total = sum(status_counts.values())
-            entropy = -sum((count/total) * math.log2(count/total) for count in status_counts.values() if count > 0)
-            
-            features_list.append({
-                'req_count': req_count,
-                'error_rate': error_rate,
-                'avg_response_time': avg_response_time,
-                'max_response_time': max_response_time,
-                'payload_mean': payload_mean,
-                'unique_endpoints': unique_endpoints,
-                'repeat_rate': repeat_rate,
-                'status_entropy': entropy
-            })
+        # Shared columnar window kernel (compiled with Numba when installed)
+        features = window_feature_matrix(requests_to_columns(requests), window_size)
+        features = features[features[:, 0] >= 5]  # Skip very small windows
         
-        return pd.DataFrame(features_list)
+        return pd.DataFrame(features, columns=WINDOW_FEATURE_COLUMNS).astype(WINDOW_FEATURE_DTYPES)
     
     def process(self):
         """Main processing function"""
@@ -0,0 +1,48 @@
+"""
+Queued Console Logging
+Shared by the simulation engine and the live middleware: callers only enqueue
+log records, and one background listener thread writes them to stdout, so the
+event loop never blocks on console writes.
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+_log_queue = queue.SimpleQueue()
+_log_listener = None
+_listener_lock = threading.Lock()
+
+
+def _start_log_listener():
+    """Start the background thread that drains the log queue (once per process)"""
+    global _log_listener
+    with _listener_lock:
+        if _log_listener is None:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _log_listener = logging.handlers.QueueListener(_log_queue, handler)
+            _log_listener.start()
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that starts the listener thread with the first record"""
+
+    def enqueue(self, record):
+        if _log_listener is None:
+            _start_log_listener()
+        super().enqueue(record)
+
+
+_queue_handler = _LazyQueueHandler(_log_queue)
+
+
+def get_queued_logger(name: str) -> logging.Logger:
+    """INFO-level, non-propagating logger whose records go through the shared queue"""
+    logger = logging.getLogger(name)
+    if _queue_handler not in logger.handlers:
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(_queue_handler)
+    return logger
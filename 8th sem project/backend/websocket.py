@@ -4,6 +4,10 @@ import json
 import asyncio
 
 
+# Clients sent to concurrently before yielding back to the event loop
+BROADCAST_CHUNK_SIZE = 50
+
+
 class ConnectionManager:
     """
     Manages WebSocket connections for real-time anomaly streaming.
@@ -32,18 +36,27 @@ class ConnectionManager:
     async def broadcast(self, message: dict):
         """
         Broadcast message to all connected WebSocket clients.
+        The message is serialized once and sent to clients concurrently, in
+        chunks of BROADCAST_CHUNK_SIZE, yielding to the event loop between chunks.
         Handles disconnections gracefully.
         """
+        payload = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        connections = list(self.active_connections)
         disconnected = []
         
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except WebSocketDisconnect:
-                disconnected.append(connection)
-            except Exception as e:
-                print(f"Error broadcasting to client: {e}")
-                disconnected.append(connection)
+        for i in range(0, len(connections), BROADCAST_CHUNK_SIZE):
+            chunk = connections[i:i + BROADCAST_CHUNK_SIZE]
+            results = await asyncio.gather(
+                *(connection.send_text(payload) for connection in chunk),
+                return_exceptions=True
+            )
+            for connection, result in zip(chunk, results):
+                if isinstance(result, WebSocketDisconnect):
+                    disconnected.append(connection)
+                elif isinstance(result, Exception):
+                    print(f"Error broadcasting to client: {result}")
+                    disconnected.append(connection)
+            await asyncio.sleep(0)
         
         for connection in disconnected:
             self.disconnect(connection)
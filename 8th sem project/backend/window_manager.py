@@ -4,7 +4,7 @@ Supports both LIVE and SIMULATION modes
 """
 import time
 import numpy as np
-from collections import deque
+from collections import Counter, deque
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import hashlib
@@ -103,9 +103,8 @@ class SlidingWindowManager:
         unique_endpoints = len(set(r.path for r in requests_list))
         
         # 3. method_ratio (GET to POST ratio)
-        get_count = sum(1 for r in requests_list if r.method == 'GET')
-        post_count = sum(1 for r in requests_list if r.method == 'POST')
-        method_ratio = get_count / max(post_count, 1)
+        method_counts = Counter(r.method for r in requests_list)
+        method_ratio = method_counts['GET'] / max(method_counts['POST'], 1)
         
         # 4. avg_payload_size
         avg_payload_size = np.mean([r.payload_size for r in requests_list])
@@ -160,17 +159,14 @@ class SlidingWindowManager:
             return 0.0
         
         # Count occurrences
-        value_counts = {}
-        for val in values:
-            value_counts[val] = value_counts.get(val, 0) + 1
+        value_counts = Counter(values)
         
         # Calculate entropy
         total = len(values)
         entropy = 0.0
         for count in value_counts.values():
-            if count > 0:
-                p = count / total
-                entropy -= p * np.log2(p)
+            p = count / total
+            entropy -= p * np.log2(p)
         
         return float(entropy)
     
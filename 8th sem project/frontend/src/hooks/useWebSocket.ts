@@ -40,6 +40,8 @@ export const useWebSocket = () => {
           setAnomalies((prev: Anomaly[]) => [message.data!, ...prev].slice(0, 100));
         } else if (message.type === 'anomaly' && message.data) {
           setAnomalies((prev: Anomaly[]) => [message.data!, ...prev].slice(0, 100));
+        } else if (message.type === 'anomaly_batch' && message.anomalies) {
+          setAnomalies((prev: Anomaly[]) => [...message.anomalies!, ...prev].slice(0, 100));
         }
       } catch (error) {
         console.error('Error parsing WebSocket message:', error);
@@ -104,6 +104,7 @@ export interface AdminQueryResponse {
 }
 
 export interface WebSocketMessage {
-  type: 'anomaly' | 'pong';
+  type: 'anomaly' | 'anomaly_batch' | 'pong';
   data?: Anomaly;
+  anomalies?: Anomaly[];
 }